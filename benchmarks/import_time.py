@@ -0,0 +1,81 @@
+"""
+Benchmark of the debiai package import time
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 20 --max-ms 150
+
+Each import runs in a new Python process, the median of --repeat runs is
+printed with the modules that import pulled in. The script exits with an error
+when a heavy dependency is imported, or when the median is above --max-ms.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on their first use only
+HEAVY_MODULES = ["pandas", "numpy", "requests", "pyarrow", "multiprocessing"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"seconds": duration, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module: str) -> dict:
+    """Import the module in a new process, return its duration and modules"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(module=module)],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--module", default="debiai.debiai")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+
+    print(
+        "import {}: {:.1f} ms (median of {} runs)".format(
+            args.module, median_ms, args.repeat
+        )
+    )
+
+    modules = runs[0]["modules"]
+    heavy = [
+        name
+        for name in HEAVY_MODULES
+        if any(m == name or m.startswith(name + ".") for m in modules)
+    ]
+    if heavy:
+        print("Heavy modules imported: " + ", ".join(heavy))
+        sys.exit(1)
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print("Slower than " + str(args.max_ms) + " ms")
+        sys.exit(1)
+    print("No heavy module imported")
+
+
+if __name__ == "__main__":
+    main()
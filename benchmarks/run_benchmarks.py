@@ -0,0 +1,367 @@
+"""
+Benchmarks of the samples and results conversions, uploads and downloads
+
+    python benchmarks/run_benchmarks.py --preset quick
+    python benchmarks/run_benchmarks.py --preset full --cases df_to_dict_tree
+    python benchmarks/run_benchmarks.py --rows 100000 --depths 3 --output out.json
+
+Each case is run on synthetic projects of varying row count, hierarchy depth,
+sibling fan-out and column width / type mix. The throughput (rows per second,
+best of --repeat runs) and the peak Python memory (tracemalloc, separate run)
+are printed and saved as JSON, then compared with a baseline: a case slower or
+bigger than the baseline by more than --threshold is a regression, and the
+script exits with an error.
+
+The upload and download cases run against the fake DebiAI backend, in the
+same process, with the --latency and --bandwidth network simulation.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_results_df, make_samples_df  # noqa: E402
+from debiai.config import get_config  # noqa: E402
+from debiai.debiai import Debiai  # noqa: E402
+from debiai.debiai_fake_backend import start_fake_backend  # noqa: E402
+from debiai.debiai_project import utils  # noqa: E402
+from debiai.debiai_services.df_to_dict_tree import (  # noqa: E402
+    df_to_dict_tree,
+    df_to_results_dict,
+)
+from debiai.debiai_services.json_stream import load_json  # noqa: E402
+from debiai.debiai_services.np_chunks import np_samples_chunks  # noqa: E402
+from debiai.debiai_services.np_to_dict import check_np_array  # noqa: E402
+from debiai.debiai_services.validation import validate_samples_df  # noqa: E402
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+PRESETS = {
+    "quick": {
+        "rows": [1000, 10000],
+        "depths": [1, 3],
+        "fan_outs": [10],
+        "columns": ["10:mixed"],
+    },
+    "full": {
+        "rows": [1000, 10000, 100000, 1000000, 5000000],
+        "depths": [1, 2, 3, 5],
+        "fan_outs": [2, 10, 100],
+        "columns": ["5:number", "20:mixed", "50:text"],
+    },
+}
+
+
+# Cases: each one prepares its inputs and returns the function to measure
+def case_np_samples(block_structure, samples_df, backend):
+    # The add_samples conversion: numpy chunks, validation, block tree
+    columns = np.array(samples_df.columns, dtype=object)
+    samples = np.vstack([columns, samples_df.to_numpy(dtype=object)])
+    index_map = check_np_array(block_structure, samples)
+    chunk_size = get_config().upload_chunk_size
+
+    def convert():
+        for df in np_samples_chunks(samples, index_map, chunk_size, start=1):
+            df_to_dict_tree(validate_samples_df(df, block_structure), block_structure)
+
+    return convert
+
+
+def case_df_to_dict_tree(block_structure, samples_df, backend):
+    return lambda: df_to_dict_tree(samples_df, block_structure)
+
+
+def case_df_to_results_dict(block_structure, samples_df, backend):
+    expected_results, results_df = make_results_df(samples_df, block_structure)
+    results_name = [result["name"] for result in expected_results]
+    return lambda: df_to_results_dict(results_df, block_structure, results_name)
+
+
+def case_decode_samples(block_structure, samples_df, backend):
+    # The blocksFromSampleIds responses, as sent by the backend
+    columns_names = utils.get_samples_columns_names(block_structure)
+    values = samples_df[columns_names].to_numpy(dtype=object).tolist()
+    page_size = get_config().samples_per_request
+    responses = []
+    for start in range(0, len(values), page_size):
+        page = values[start : start + page_size]  # noqa
+        data = {"id-" + str(start + i): sample for i, sample in enumerate(page)}
+        responses.append(json.dumps({"data": data}))
+
+    def decode():
+        columns = utils.create_samples_columns(columns_names)
+        for response in responses:
+            page = utils.create_samples_columns(columns_names)
+            utils.decode_samples(json.loads(response)["data"], columns_names, page)
+            for column_name in columns:
+                columns[column_name].extend(page[column_name])
+        return utils.samples_columns_to_df(columns, block_structure)
+
+    return decode
+
+
+class StreamedResponse:
+    """A response body read by chunks, as with requests stream=True"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]  # noqa
+
+
+def case_decode_samples_stream(block_structure, samples_df, backend):
+    # The same responses as decode_samples, parsed as they are streamed
+    columns_names = utils.get_samples_columns_names(block_structure)
+    values = samples_df[columns_names].to_numpy(dtype=object).tolist()
+    page_size = get_config().samples_per_request
+    responses = []
+    for start in range(0, len(values), page_size):
+        page = values[start : start + page_size]  # noqa
+        data = {"id-" + str(start + i): sample for i, sample in enumerate(page)}
+        responses.append(json.dumps({"data": data}).encode())
+
+    def decode():
+        columns = utils.create_samples_columns(columns_names)
+        for response in responses:
+            utils.decode_samples_stream(
+                StreamedResponse(response), columns_names, columns
+            )
+        return utils.samples_columns_to_df(columns, block_structure)
+
+    return decode
+
+
+def case_load_json(block_structure, samples_df, backend):
+    # One large nested value: the samples tree, streamed
+    response = json.dumps({"tree": df_to_dict_tree(samples_df, block_structure)})
+    response = StreamedResponse(response.encode())
+    chunk_size = get_config().stream_chunk_size
+    return lambda: load_json(response.iter_content(chunk_size))
+
+
+def case_upload(block_structure, samples_df, backend):
+    debiai_instance = Debiai(backend.url)
+    name = "upload-" + str(time.time_ns())
+
+    def upload():
+        if debiai_instance.get_project(name) is not None:
+            debiai_instance.delete_project_byId(name)
+        project = debiai_instance.create_project(name)
+        project.set_blockstructure(block_structure)
+        project.add_samples_pd(samples_df)
+
+    return upload
+
+
+def case_upload_processes(block_structure, samples_df, backend):
+    debiai_instance = Debiai(backend.url)
+    name = "upload-" + str(time.time_ns())
+
+    def upload():
+        if debiai_instance.get_project(name) is not None:
+            debiai_instance.delete_project_byId(name)
+        project = debiai_instance.create_project(name)
+        project.set_blockstructure(block_structure)
+        project.add_samples_pd(samples_df, processes=os.cpu_count())
+
+    return upload
+
+
+def case_download(block_structure, samples_df, backend):
+    debiai_instance = Debiai(backend.url)
+    project = debiai_instance.create_project("download-" + str(time.time_ns()))
+    project.set_blockstructure(block_structure)
+    project.add_samples_pd(samples_df)
+    return project.get_dataframe
+
+
+# name: (function, maximum number of rows)
+CASES = {
+    "np_samples": (case_np_samples, None),
+    "df_to_dict_tree": (case_df_to_dict_tree, None),
+    "df_to_results_dict": (case_df_to_results_dict, None),
+    "decode_samples": (case_decode_samples, None),
+    "decode_samples_stream": (case_decode_samples_stream, None),
+    "load_json": (case_load_json, None),
+    "upload": (case_upload, 1000000),
+    "upload_processes": (case_upload_processes, 1000000),
+    "download": (case_download, 1000000),
+}
+
+
+def measure(func, repeat: int, memory: bool):
+    """Return the best duration of repeat runs and the peak memory of one run"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(durations), peak
+
+
+def run(args, backend) -> list:
+    results = []
+    grid = itertools.product(
+        args.cases, args.rows, args.depths, args.fan_outs, args.columns
+    )
+    for case, nb_rows, depth, fan_out, columns in grid:
+        func, max_rows = CASES[case]
+        if max_rows is not None and nb_rows > max_rows:
+            continue
+
+        nb_columns, mix = columns.split(":")
+        case_id = "{}/rows={}/depth={}/fan_out={}/columns={}".format(
+            case, nb_rows, depth, fan_out, columns
+        )
+
+        block_structure, samples_df = make_samples_df(
+            nb_rows, depth, fan_out, int(nb_columns), mix
+        )
+        # The progress bars of the uploads aren't part of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            to_measure = func(block_structure, samples_df, backend)
+            seconds, peak = measure(to_measure, args.repeat, args.memory)
+
+        result = {
+            "id": case_id,
+            "case": case,
+            "rows": nb_rows,
+            "depth": depth,
+            "fan_out": fan_out,
+            "columns": columns,
+            "seconds": seconds,
+            "rows_per_second": nb_rows / seconds,
+            "peak_memory_mb": None if peak is None else peak / 1024**2,
+        }
+        results.append(result)
+        print(
+            "{:<60} {:>12,.0f} rows/s {:>10}".format(
+                case_id,
+                result["rows_per_second"],
+                "" if peak is None else "{:.1f} MB".format(result["peak_memory_mb"]),
+            )
+        )
+    return results
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Return the regressions of the results compared with the baseline"""
+    baseline_results = {result["id"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_results.get(result["id"])
+        if base is None:
+            continue
+
+        if result["rows_per_second"] < base["rows_per_second"] * (1 - threshold):
+            regressions.append(
+                "{} : {:,.0f} rows/s, baseline {:,.0f} rows/s".format(
+                    result["id"], result["rows_per_second"], base["rows_per_second"]
+                )
+            )
+
+        peak, base_peak = result["peak_memory_mb"], base.get("peak_memory_mb")
+        # 1 MB of slack for the small cases
+        if peak is not None and base_peak is not None:
+            if peak > base_peak * (1 + threshold) + 1:
+                regressions.append(
+                    "{} : {:.1f} MB, baseline {:.1f} MB".format(
+                        result["id"], peak, base_peak
+                    )
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--rows", nargs="+", type=int)
+    parser.add_argument("--depths", nargs="+", type=int)
+    parser.add_argument("--fan-outs", nargs="+", type=int)
+    parser.add_argument(
+        "--columns", nargs="+", help="number and types of columns, ex: 10:mixed"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--bandwidth", type=float, default=0, help="bytes/s")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="save the results as baseline"
+    )
+    args = parser.parse_args()
+
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+
+def main():
+    args = parse_args()
+    backend = start_fake_backend(latency=args.latency, bandwidth=args.bandwidth)
+    try:
+        results = run(args, backend)
+    finally:
+        backend.shutdown()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "latency": args.latency,
+        "bandwidth": args.bandwidth,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Results saved in " + args.output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Baseline saved in " + args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with: " + args.baseline)
+        return
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print("Regressions (threshold " + str(args.threshold) + "):")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    print("No regression (threshold " + str(args.threshold) + ")")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Synthetic projects for the benchmarks
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS_TYPES = {
+    "number": ["number"],
+    "text": ["text"],
+    "mixed": ["number", "text", "number", "boolean"],
+}
+TEXT_VALUES = np.array(["car", "pedestrian", "bicycle", "truck", "traffic light"])
+
+
+def make_block_structure(depth: int, nb_columns: int, mix: str) -> list:
+    """
+    Return a block structure of depth levels, the sample level is the last one
+    and has the nb_columns contexts, typed with the mix types in turn
+    """
+    types = COLUMNS_TYPES[mix]
+    block_structure = [{"name": "level " + str(level)} for level in range(depth)]
+    block_structure[-1]["contexts"] = [
+        {"name": "column " + str(i), "type": types[i % len(types)]}
+        for i in range(nb_columns)
+    ]
+    return block_structure
+
+
+def make_samples_df(
+    nb_rows: int, depth: int, fan_out: int, nb_columns: int, mix: str, seed: int = 0
+):
+    """
+    Return the block structure and the samples dataframe of a synthetic project
+    Each block has fan_out children, the sample blocks have fan_out samples
+    """
+    rng = np.random.default_rng(seed)
+    block_structure = make_block_structure(depth, nb_columns, mix)
+
+    rows = np.arange(nb_rows)
+    data = {}
+    for level, block in enumerate(block_structure):
+        if level == depth - 1:
+            ids = rows
+        else:
+            ids = rows // fan_out ** (depth - 1 - level)
+        data[block["name"]] = np.char.add(block["name"] + "-", ids.astype(str))
+
+    for column in block_structure[-1]["contexts"]:
+        if column["type"] == "number":
+            data[column["name"]] = rng.random(nb_rows)
+        elif column["type"] == "text":
+            data[column["name"]] = TEXT_VALUES[
+                rng.integers(0, len(TEXT_VALUES), nb_rows)
+            ]
+        else:
+            data[column["name"]] = rng.random(nb_rows) > 0.5
+
+    return block_structure, pd.DataFrame(data)
+
+
+def make_results_df(samples_df: pd.DataFrame, block_structure: list, seed: int = 0):
+    """Return the expected results and the results dataframe of a synthetic model"""
+    rng = np.random.default_rng(seed)
+    expected_results = [
+        {"name": "prediction", "type": "number", "default": 0},
+        {"name": "label", "type": "text", "default": ""},
+    ]
+
+    nb_rows = samples_df.shape[0]
+    block_names = [block["name"] for block in block_structure]
+    results_df = samples_df[block_names].copy()
+    results_df["prediction"] = rng.random(nb_rows)
+    results_df["label"] = TEXT_VALUES[rng.integers(0, len(TEXT_VALUES), nb_rows)]
+    return expected_results, results_df
@@ -1,5 +1,6 @@
-# For relative imports to work in Python 3.6
-import os
-import sys
+"""
+DebiAI python module, the entry point is debiai.debiai.Debiai
 
-sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+Importing the package has no side effect, the heavy dependencies (pandas,
+numpy, requests, pyarrow) are imported on their first use
+"""
@@ -5,18 +5,183 @@ DebiAI python module configuration
 import os
 from typing import Optional
 
+# Knob: (default value, type), each one can be set with a DEBIAI_{KNOB} variable
+KNOBS = {
+    # Number of samples or results downloaded in one request
+    "samples_per_request": (4000, int),
+    # Number of samples or results uploaded in one request
+    "upload_chunk_size": (5000, int),
+    # Number of samples ID above which a selection is streamed to the backend
+    "selection_chunk_size": (100000, int),
+    # Maximum number of requests sent at the same time
+    "max_parallel_requests": (4, int),
+    # Size in bytes of the chunks of the streamed responses
+    "stream_chunk_size": (64 * 1024, int),
+    # Maximum size in bytes of the data waiting in a background uploader
+    "max_queue_bytes": (256 * 1024 * 1024, int),
+    # Seconds a background upload smaller than upload_chunk_size waits for more
+    # rows before being sent, 0 to send it right away
+    "upload_linger": (0.1, float),
+    # Seconds to wait for the backend, None to wait forever
+    "timeout": (None, float),
+    # Number of times a request is sent again after a connection error,
+    # a timeout or a 502, 503, 504 response, a POST only when the connection
+    # couldn't be opened
+    "retries": (0, int),
+    # Seconds before the first retry, doubled at each retry
+    "retry_backoff": (0.5, float),
+    # Gzip the uploaded JSON bodies, off in every preset: the DebiAI backend
+    # doesn't decode gzipped bodies, only enable it behind a server that does
+    "compression": (False, bool),
+}
+
+PRESETS = {
+    # Low latency, high bandwidth network: small pages, many in flight
+    "low_latency_lan": {
+        "samples_per_request": 2000,
+        "upload_chunk_size": 2000,
+        "max_parallel_requests": 8,
+        "timeout": 30.0,
+    },
+    # High latency network and large projects: big pages, long timeouts and
+    # retries
+    "wan_bulk": {
+        "samples_per_request": 20000,
+        "upload_chunk_size": 20000,
+        "max_parallel_requests": 8,
+        "timeout": 300.0,
+        "retries": 3,
+        "retry_backoff": 1.0,
+    },
+    # Small pages and buffers, few requests in flight
+    "memory_constrained": {
+        "samples_per_request": 1000,
+        "upload_chunk_size": 1000,
+        "selection_chunk_size": 20000,
+        "max_parallel_requests": 2,
+        "stream_chunk_size": 16 * 1024,
+        "max_queue_bytes": 32 * 1024 * 1024,
+    },
+}
+
+# Knobs that can be 0
+ZERO_KNOBS = ["retries", "retry_backoff", "upload_linger"]
+
+TRUE_STRINGS = ["1", "true", "yes", "on"]
+FALSE_STRINGS = ["0", "false", "no", "off"]
+
 
 class DebiaiConfig:
-    """Global configuration object for Debiai"""
+    """
+    Global configuration object for Debiai
+
+    preset: one of the PRESETS names, its values replace the defaults
+    The other arguments are the KNOBS, they replace the preset values
+    """
 
     def __init__(
         self,
         debiai_app_url: str = "http://localhost:3000",
+        preset: Optional[str] = None,
+        **knobs,
     ):
         self.debiai_app_url = debiai_app_url
+        self.preset = preset
+
+        values = {knob: default for knob, (default, _) in KNOBS.items()}
+        if preset is not None:
+            if preset not in PRESETS:
+                raise ValueError(
+                    "Unknown preset '"
+                    + str(preset)
+                    + "', the presets are: "
+                    + ", ".join(PRESETS)
+                )
+            values.update(PRESETS[preset])
+
+        for knob, value in knobs.items():
+            if knob not in KNOBS:
+                raise TypeError("Unknown configuration knob '" + knob + "'")
+            values[knob] = value
+
+        for knob, value in values.items():
+            setattr(self, knob, _check_knob(knob, value))
+
+    @classmethod
+    def from_env(cls, environ=None) -> "DebiaiConfig":
+        """
+        Create a configuration from the DEBIAI_APP_URL, DEBIAI_PRESET and
+        DEBIAI_{KNOB} environment variables, ex: DEBIAI_MAX_PARALLEL_REQUESTS=8
+        """
+        if environ is None:
+            environ = os.environ
+
+        knobs = {}
+        for knob in KNOBS:
+            variable = "DEBIAI_" + knob.upper()
+            if variable in environ:
+                knobs[knob] = _parse_knob(knob, environ[variable], variable)
+
+        return cls(
+            debiai_app_url=environ.get("DEBIAI_APP_URL", "http://localhost:3000/"),
+            preset=environ.get("DEBIAI_PRESET") or None,
+            **knobs,
+        )
 
     def __repr__(self):
-        return f"DebiaiConfig ( " f"debiai_app_url: {self.debiai_app_url} " f")"
+        knobs = " ".join(f"{knob}: {getattr(self, knob)}" for knob in KNOBS)
+        return (
+            f"DebiaiConfig ( "
+            f"debiai_app_url: {self.debiai_app_url} "
+            f"preset: {self.preset} "
+            f"{knobs} "
+            f")"
+        )
+
+
+def _parse_knob(knob: str, text: str, variable: str):
+    """Convert an environment variable value to the knob type"""
+    type_ = KNOBS[knob][1]
+    text = text.strip()
+    if text.lower() in ["", "none"] and KNOBS[knob][0] is None:
+        return None
+
+    if type_ is bool:
+        if text.lower() in TRUE_STRINGS:
+            return True
+        if text.lower() in FALSE_STRINGS:
+            return False
+    else:
+        try:
+            return type_(text)
+        except ValueError:
+            pass
+
+    raise ValueError(
+        "Invalid " + variable + " value '" + text + "', expected a " + type_.__name__
+    )
+
+
+def _check_knob(knob: str, value):
+    default, type_ = KNOBS[knob]
+    if value is None and default is None:
+        return None
+
+    if type_ is bool:
+        if not isinstance(value, bool):
+            raise TypeError("The '" + knob + "' knob must be a boolean")
+        return value
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError("The '" + knob + "' knob must be a number")
+    if type_ is int and value != int(value):
+        raise TypeError("The '" + knob + "' knob must be an integer")
+
+    # The retries and the waits can be disabled, the other knobs are sizes
+    # and durations
+    if value < 0 or (value == 0 and knob not in ZERO_KNOBS):
+        raise ValueError("The '" + knob + "' knob must be positive")
+    return type_(value)
 
 
 _DEBIAI_CONFIG: Optional[DebiaiConfig] = None
@@ -28,9 +193,7 @@ def configure_config(provided_config: Optional[DebiaiConfig] = None):
     if provided_config is not None:
         _DEBIAI_CONFIG = provided_config
     else:
-        _DEBIAI_CONFIG = DebiaiConfig(
-            debiai_app_url=os.environ.get("DEBIAI_APP_URL", "http://localhost:3000/")
-        )
+        _DEBIAI_CONFIG = DebiaiConfig.from_env()
 
 
 def get_config() -> DebiaiConfig:
@@ -8,9 +8,9 @@
     License : Apache 2.0
 """
 
-from typing import List, Union
+from typing import Callable, List, Union
 
-import utils as utils
+from . import utils
 from .debiai_project import Debiai_project
 
 
@@ -65,6 +65,13 @@ class Debiai:
 
         return projects
 
+    def list_project_summaries(self) -> List[dict]:
+        """
+        Return the server projects list as sent by the server (id, name,
+        number of samples, dates...), without loading each project
+        """
+        return utils.get_projects(self.debiai_url)
+
     def get_project(self, project_id: str) -> Union[Debiai_project, None]:
         """
         Return a project by name, returns none if the project doesn't exist
@@ -111,3 +118,48 @@ class Debiai:
         if type(projectId) is not str:
             raise ValueError("Project ID must be a string")
         return utils.delete_project(self.debiai_url, projectId)
+
+    def delete_projects(
+        self,
+        projects: Union[List[str], Callable[[dict], bool]],
+        max_workers: int = None,
+    ) -> List[str]:
+        """
+        Remove several projects from the server, the deletions are sent concurrently
+
+        projects: a list of project IDs, or a function selecting the projects
+            to delete from their summary (see list_project_summaries), ex:
+            debiai.delete_projects(lambda p: p["name"].startswith("ci_"))
+        max_workers: the maximum number of deletions sent at the same time
+
+        Raise an error listing the projects that couldn't be deleted
+        return the deleted projects IDs
+        """
+        if callable(projects):
+            projects_id = [
+                project["id"]
+                for project in self.list_project_summaries()
+                if projects(project)
+            ]
+        elif isinstance(projects, list):
+            projects_id = projects
+            if not all(isinstance(id, str) and id != "" for id in projects_id):
+                raise ValueError("The project IDs must be non empty strings")
+        else:
+            raise TypeError("Projects must be a list of project IDs or a function")
+
+        results = utils.parallel_map(
+            lambda id: utils.delete_project(self.debiai_url, id),
+            projects_id,
+            max_workers,
+            return_exceptions=True,
+        )
+
+        errors = []
+        for project_id, result in zip(projects_id, results):
+            if result is not True:
+                errors.append("'" + project_id + "': " + str(result))
+        if errors:
+            raise ValueError("Some projects couldn't be deleted: " + ", ".join(errors))
+
+        return projects_id
@@ -0,0 +1,442 @@
+"""
+In-process stand-in for the DebiAI backend, for offline tests and benchmarks
+
+It implements the endpoints used by the debiai module with an in-memory
+storage, and can simulate a network with an artificial latency per response
+and a bandwidth limit:
+
+    server = start_fake_backend(port=3000, latency=0.005, bandwidth=50e6)
+    debiai_instance = Debiai(server.url)
+    ...
+    server.shutdown()
+
+Or from a shell:
+
+    python -m debiai.debiai_fake_backend --port 3000 --latency 0.005
+
+The sample ID is the SHA-256 hash of the sample block path.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+DATA_TYPES = ["groundTruth", "contexts", "inputs", "others"]
+
+
+def sample_id_from_path(path: str) -> str:
+    return hashlib.sha256(path.encode("utf-8")).hexdigest()
+
+
+class Store:
+    """The backend projects, the requests are handled one at a time"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.projects = {}
+
+    def new_project(self, name):
+        now = int(time.time() * 1000)
+        return {
+            "id": name,
+            "name": name,
+            "blockLevelInfo": [],
+            "resultStructure": None,
+            "models": {},
+            "selections": {},
+            "tags": {},
+            "samples": {},
+            "creationDate": now,
+            "updateDate": now,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Route the requests to the endpoints functions below"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeDebiAI"
+
+    def log_message(self, *args):
+        pass
+
+    # Plumbing
+    def _body(self):
+        """Read the JSON body, plain, gzipped or chunked"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            raw = b"".join(chunks)
+        else:
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else None
+
+    def _send(self, status, payload):
+        """Send a JSON response, delayed by the configured latency and bandwidth"""
+        body = json.dumps(payload).encode("utf-8")
+        cfg = self.server.config
+        delay = cfg["latency"]
+        if cfg["bandwidth"]:
+            delay += len(body) / cfg["bandwidth"]
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        path = unquote(self.path.split("?")[0]).rstrip("/")
+        body = self._body() if method in ("POST", "PUT") else None
+        for route_method, pattern, func in ROUTES:
+            if route_method != method:
+                continue
+            match = re.fullmatch(pattern, path)
+            if match:
+                store = self.server.store
+                with store.lock:
+                    try:
+                        status, payload = func(store, body, *match.groups())
+                    except KeyError as e:
+                        status, payload = 404, "Not found: " + str(e)
+                self._send(status, payload)
+                return
+        self._send(404, "Unknown route " + path)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+# Endpoints: each one returns a status code and a JSON payload
+P = r"/data-providers/[^/]+/projects"
+
+
+def _project_summary(p):
+    return {
+        "id": p["id"],
+        "name": p["name"],
+        "nbSamples": len(p["samples"]),
+        "nbModels": len(p["models"]),
+        "nbSelections": len(p["selections"]),
+        "creationDate": p["creationDate"],
+        "updateDate": p["updateDate"],
+    }
+
+
+def version(store, body):
+    return 200, "Online"
+
+
+def list_projects(store, body):
+    return 200, [_project_summary(p) for p in store.projects.values()]
+
+
+def get_project(store, body, pid):
+    if pid not in store.projects:
+        return 404, "Project not found"
+    p = store.projects[pid]
+    ret = _project_summary(p)
+    ret["blockLevelInfo"] = p["blockLevelInfo"]
+    if p["resultStructure"] is not None:
+        ret["resultStructure"] = p["resultStructure"]
+    ret["models"] = [
+        {"id": m["id"], "name": m["name"], "nbResults": len(m["results"])}
+        for m in p["models"].values()
+    ]
+    return 200, ret
+
+
+def post_project(store, body):
+    name = body["projectName"]
+    if name in store.projects:
+        return 400, "Project '" + name + "' already exists"
+    store.projects[name] = store.new_project(name)
+    return 200, {"id": name}
+
+
+def delete_project(store, body, pid):
+    if pid not in store.projects:
+        return 404, "Project not found"
+    del store.projects[pid]
+    return 200, "Project deleted"
+
+
+def post_blocklevels(store, body, pid):
+    store.projects[pid]["blockLevelInfo"] = body
+    return 200, body
+
+
+def post_results_structure(store, body, pid):
+    store.projects[pid]["resultStructure"] = body
+    return 200, body
+
+
+def post_expected_result(store, body, pid):
+    p = store.projects[pid]
+    p["resultStructure"].append(body)
+    for model in p["models"].values():
+        for results in model["results"].values():
+            results.append(body["default"])
+    return 200, p["resultStructure"]
+
+
+def del_expected_result(store, body, pid):
+    p = store.projects[pid]
+    names = [r["name"] for r in p["resultStructure"]]
+    index = names.index(body["value"])
+    p["resultStructure"].pop(index)
+    for model in p["models"].values():
+        for results in model["results"].values():
+            results.pop(index)
+    return 200, p["resultStructure"]
+
+
+def post_blocks(store, body, pid):
+    p = store.projects[pid]
+    levels = p["blockLevelInfo"]
+    added = 0
+
+    def walk(blocks, level, path, values):
+        nonlocal added
+        for block in blocks:
+            block_path = path + str(block["name"]) + "/"
+            block_values = values + [block["name"]]
+            for data_type in DATA_TYPES:
+                block_values += block.get(data_type, [])
+            if level == len(levels) - 1:
+                sample_id = sample_id_from_path(block_path)
+                # The samples already in the project are kept as they are
+                if sample_id not in p["samples"]:
+                    added += 1
+                    p["samples"][sample_id] = block_values
+            else:
+                walk(
+                    block.get("childrenInfoList", []),
+                    level + 1,
+                    block_path,
+                    block_values,
+                )
+
+    walk(body["blockTree"], 0, "", [])
+    return (200 if added else 201), {"nbSamplesAdded": added}
+
+
+def data_id_list(store, body, pid):
+    ids = list(store.projects[pid]["samples"])
+    start = body.get("from", 0) if body else 0
+    end = body.get("to", len(ids) - 1) if body else len(ids) - 1
+    return 200, ids[start : end + 1]  # noqa
+
+
+def blocks_from_ids(store, body, pid):
+    samples = store.projects[pid]["samples"]
+    return 200, {"data": {i: samples[i] for i in body["sampleIds"] if i in samples}}
+
+
+def get_selections(store, body, pid):
+    return 200, [
+        {k: s[k] for k in ("id", "name", "creationDate", "nbSamples")}
+        for s in store.projects[pid]["selections"].values()
+    ]
+
+
+def post_selection(store, body, pid):
+    p = store.projects[pid]
+    missing = [i for i in body["sampleHashList"] if i not in p["samples"]]
+    if missing:
+        return 400, "The following samples do not exist: " + ", ".join(missing[:10])
+    sid = str(len(p["selections"]) + 1) + "_" + str(time.time_ns())
+    selection = {
+        "id": sid,
+        "name": body["selectionName"],
+        "creationDate": int(time.time() * 1000),
+        "nbSamples": len(body["sampleHashList"]),
+        "samples": list(body["sampleHashList"]),
+    }
+    p["selections"][sid] = selection
+    return 200, {k: selection[k] for k in ("id", "name", "creationDate", "nbSamples")}
+
+
+def get_selection(store, body, pid, sid):
+    return 200, store.projects[pid]["selections"][sid]["samples"]
+
+
+def delete_selection(store, body, pid, sid):
+    del store.projects[pid]["selections"][sid]
+    return 200, "Selection deleted"
+
+
+def post_model(store, body, pid):
+    p = store.projects[pid]
+    if any(m["name"] == body["name"] for m in p["models"].values()):
+        return 409, "Model already exists"
+    # The ID differs from the name, like the selections ones
+    mid = str(len(p["models"]) + 1) + "_" + str(time.time_ns())
+    p["models"][mid] = {
+        "id": mid,
+        "name": body["name"],
+        "metadata": body.get("metadata", {}),
+        "results": {},
+    }
+    return 200, "Model added"
+
+
+def delete_model(store, body, pid, mid):
+    del store.projects[pid]["models"][mid]
+    return 200, "Model deleted"
+
+
+def post_results_dict(store, body, pid, mid):
+    p = store.projects[pid]
+    model = p["models"][mid]
+    order = [r["name"] for r in p["resultStructure"]]
+    given = body["expected_results_order"]
+    depth = len(p["blockLevelInfo"])
+
+    def walk(tree, level, path):
+        for name, sub in tree.items():
+            block_path = path + str(name) + "/"
+            if level == depth - 1:
+                model["results"][sample_id_from_path(block_path)] = [
+                    sub[given.index(n)] for n in order
+                ]
+            else:
+                walk(sub, level + 1, block_path)
+
+    walk(body["results"], 0, "")
+    return 200, "Results added"
+
+
+def evaluated_ids(store, body, pid, mid):
+    return 200, list(store.projects[pid]["models"][mid]["results"])
+
+
+def model_results(store, body, pid, mid):
+    results = store.projects[pid]["models"][mid]["results"]
+    return 200, {i: results[i] for i in body["sampleIds"] if i in results}
+
+
+def get_tags(store, body, pid):
+    return 200, [
+        {"id": t["id"], "name": t["name"]} for t in store.projects[pid]["tags"].values()
+    ]
+
+
+def get_tag(store, body, pid, tid):
+    return 200, store.projects[pid]["tags"][tid]
+
+
+def post_tag(store, body, pid):
+    tags = store.projects[pid]["tags"]
+    for tag in tags.values():
+        if tag["name"] == body["tagName"]:
+            tag["tags"].update(body["tagHash"])
+            tag["updateDate"] = int(time.time() * 1000)
+            return 200, tag
+    now = int(time.time() * 1000)
+    tag = {
+        "id": str(len(tags) + 1),
+        "name": body["tagName"],
+        "tags": dict(body["tagHash"]),
+        "creationDate": now,
+        "updateDate": now,
+    }
+    tags[tag["id"]] = tag
+    return 200, tag
+
+
+def get_tag_samples(store, body, pid, tid, value):
+    tag = store.projects[pid]["tags"][tid]
+    return 200, [h for h, v in tag["tags"].items() if str(v) == value]
+
+
+ROUTES = [
+    ("GET", r"/version", version),
+    ("GET", P, list_projects),
+    ("POST", r"/projects", post_project),
+    ("GET", P + r"/([^/]+)", get_project),
+    ("DELETE", P + r"/([^/]+)", delete_project),
+    ("POST", P + r"/([^/]+)/blocklevels", post_blocklevels),
+    ("POST", P + r"/([^/]+)/resultsStructure", post_results_structure),
+    ("POST", P + r"/([^/]+)/expectedResult", post_expected_result),
+    ("POST", P + r"/([^/]+)/del_expectedResult", del_expected_result),
+    ("POST", P + r"/([^/]+)/blocks", post_blocks),
+    ("POST", P + r"/([^/]+)/dataIdList", data_id_list),
+    ("POST", P + r"/([^/]+)/blocksFromSampleIds", blocks_from_ids),
+    ("GET", P + r"/([^/]+)/selections", get_selections),
+    ("POST", P + r"/([^/]+)/selections", post_selection),
+    ("GET", P + r"/([^/]+)/selections/([^/]+)", get_selection),
+    ("DELETE", P + r"/([^/]+)/selections/([^/]+)", delete_selection),
+    ("POST", P + r"/([^/]+)/models", post_model),
+    ("DELETE", P + r"/([^/]+)/models/([^/]+)", delete_model),
+    ("POST", P + r"/([^/]+)/models/([^/]+)/resultsDict", post_results_dict),
+    ("GET", P + r"/([^/]+)/models/([^/]+)/evaluated-data-id-list", evaluated_ids),
+    ("POST", P + r"/([^/]+)/models/([^/]+)/results", model_results),
+    ("GET", P + r"/([^/]+)/tags", get_tags),
+    ("POST", P + r"/([^/]+)/tags", post_tag),
+    ("GET", P + r"/([^/]+)/tags/([^/]+)", get_tag),
+    ("GET", P + r"/([^/]+)/tags/([^/]+)/samples/([^/]+)", get_tag_samples),
+]
+
+
+def start_fake_backend(
+    port: int = 0, latency: float = 0.0, bandwidth: float = 0
+) -> ThreadingHTTPServer:
+    """
+    Start the fake backend in a background thread
+    port: 0 to pick a free port
+    latency: delay added to each response, in seconds
+    bandwidth: response bytes sent per second, 0 for no limit
+    return the server, its url attribute is the backend url
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.store = Store()
+    server.config = {"latency": latency, "bandwidth": bandwidth}
+    server.url = "http://localhost:" + str(server.server_address[1])
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake DebiAI backend")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--bandwidth", type=float, default=0, help="bytes/s")
+    args = parser.parse_args()
+
+    server = start_fake_backend(args.port, args.latency, args.bandwidth)
+    print("Fake DebiAI backend running at " + server.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
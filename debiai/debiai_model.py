@@ -1,8 +1,15 @@
+from __future__ import annotations
+
 from typing import List
-import numpy as np
-import pandas as pd
 
-import utils as utils
+from . import utils
+from .config import get_config
+from .debiai_services.lazy_import import LazyModule
+from .debiai_services.arrow import check_arrow_table, arrow_to_results_dict
+from .debiai_services.df_to_dict_tree import df_to_results_dict
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
 
 
 class Debiai_model:
@@ -16,15 +23,16 @@ class Debiai_model:
         self.id = id
         self.metadata = metadata
 
-    def expected_results_exists(self):
+    def expected_results_exists(self, snapshot=None):
         """
         Check if the expected results are defined, raise an error if not
+        snapshot: the project snapshot to check, the current one by default
         """
-        if self.project.expected_results is None:
-            raise ValueError(
-                "The project expected results need to be specified \
-before doing this operation"
-            )
+        if snapshot is None:
+            snapshot = self.project.snapshot
+        if snapshot.expected_results is None:
+            raise ValueError("The project expected results need to be specified \
+before doing this operation")
 
     def add_results_dict(
         self, results: dict, expected_results_order: List[str] = None
@@ -36,15 +44,23 @@ before doing this operation"
         the end of the tree and in the expected_results_order array.
         """
         # Update the block structure & expected results
-        self.project.project_infos()
+        snapshot = self.project.fetch_snapshot()
+        return self.__add_results_dict(results, snapshot, expected_results_order)
 
-        self.expected_results_exists()
+    def __add_results_dict(
+        self, results: dict, snapshot, expected_results_order: List[str] = None
+    ) -> bool:
+        """
+        Check and upload a results dict against one project snapshot,
+        the block structure and expected results can't change in between
+        """
+        self.expected_results_exists(snapshot)
 
         if type(results) is not dict:
             raise ValueError("Results must be of type dict")
 
         if expected_results_order is not None:
-            for expected_result in self.project.expected_results:
+            for expected_result in snapshot.expected_results:
                 if expected_result["name"] not in expected_results_order:
                     raise ValueError(
                         "The expected result '"
@@ -54,7 +70,7 @@ before doing this operation"
 
             for given_expected_result in expected_results_order:
                 result_expected = False
-                for expected_result in self.project.expected_results:
+                for expected_result in snapshot.expected_results:
                     if given_expected_result == expected_result["name"]:
                         result_expected = True
                 if not result_expected:
@@ -65,11 +81,11 @@ before doing this operation"
                     )
         else:
             expected_results_order = list(
-                map(lambda r: r["name"], self.project.expected_results)
+                map(lambda r: r["name"], snapshot.expected_results)
             )
 
         # Start the results verification
-        sampleIndex = len(self.project.block_structure) - 1
+        sampleIndex = len(snapshot.block_structure) - 1
 
         for rootBlock in results:
             self.__checkResultDict(
@@ -81,42 +97,37 @@ before doing this operation"
             )
 
         # Upload the results
-        return utils.post_model_results_dict(
-            self.project.debiai_url,
-            self.project.id,
-            self.id,
-            results,
-            expected_results_order,
+        return self.project._post_model_results_dict(
+            self.id, results, expected_results_order
         )
 
     def add_results_df(self, results: pd.DataFrame, map_id=None) -> bool:
         """
         Add results from a dataFrame.
+        The dataframe needs the block names columns and the expected results
+        columns, a missing column raises a ValueError.
+        map_id: kept for compatibility, every block column is required
         """
         # Add results with __add_results_pd sequentially
         p_bar = utils.progress_bar("Adding results", results.shape[0], self.name)
         results_added = 0
 
-        chunk_size = 5000
+        # One snapshot for all the chunks
+        snapshot = self.project.fetch_snapshot()
+        chunk_size = get_config().upload_chunk_size
         for start in range(0, results.shape[0], chunk_size):
             results_subset = results.iloc[start : start + chunk_size]  # noqa
 
-            self.__add_results_pd(results_subset, map_id=map_id)
+            self.__add_results_pd(results_subset, snapshot)
 
             results_added = results_added + results_subset.shape[0]
             p_bar.update(results_added)
 
         return True
 
-    def __add_results_pd(self, results: pd.DataFrame, map_id=None) -> bool:
+    def __add_results_pd(self, results: pd.DataFrame, snapshot) -> bool:
         """Add results to the model from a pd dataframe"""
-        self.expected_results_exists()
-
-        # Check if block names are in df columns.
-        for block in self.project.block_structure:
-            if block["name"] not in results.columns and block["name"] != map_id:
-                print("'" + block["name"] + "' is missing from the given samples")
-                return False
+        self.expected_results_exists(snapshot)
 
         # Dataframe form
         # b1    b2    sample    res1  res2  res3
@@ -137,45 +148,41 @@ before doing this operation"
 
         # Extract results name
         results_name = []
-        for result in self.project.expected_results:
+        for result in snapshot.expected_results:
             results_name.append(result["name"])
 
-        # Transform DataFrame into dic recursively
-        dic_res = self.__pd_to_dict_recur(results, 0, results_name)
-
-        return self.add_results_dict(dic_res)
+        dic_res = df_to_results_dict(results, snapshot.block_structure, results_name)
 
-    def __pd_to_dict_recur(self, df: pd.DataFrame, level: int, results_name) -> dict:
-        blockLevel = self.project.block_structure[level]
-        dictRet = {}
+        return self.__add_results_dict(dic_res, snapshot)
 
-        if level == len(self.project.block_structure) - 1:
-            # Sample level
-            # Extract results
+    def add_results_arrow(self, results) -> bool:
+        """
+        Add results from a pyarrow Table, without converting it to a DataFrame:
+        the columns of each slice are converted to Python values.
+        The table needs the block names columns and the expected results columns.
+        """
+        check_arrow_table(results, "results")
+        snapshot = self.project.fetch_snapshot()
+        self.expected_results_exists(snapshot)
 
-            df_results_dict = df.to_dict("records")
+        results_name = []
+        for result in snapshot.expected_results:
+            results_name.append(result["name"])
 
-            # df_results_dict records :
-            # [
-            #     {"sampleId": 1, "res1": 1, "res2": 1, ...},
-            #     ...
-            # ]
+        p_bar = utils.progress_bar("Adding results", results.num_rows, self.name)
 
-            for record in df_results_dict:
-                dictRet[record[blockLevel["name"]]] = []
-                for resName in results_name:
-                    dictRet[record[blockLevel["name"]]].append(record[resName])
+        chunk_size = get_config().upload_chunk_size
+        for start in range(0, results.num_rows, chunk_size):
+            results_subset = results.slice(start, chunk_size)
 
-        else:
-            # Other levels
-            dfs = dict(tuple(df.groupby(blockLevel["name"])))
+            dic_res = arrow_to_results_dict(
+                results_subset, snapshot.block_structure, results_name
+            )
+            self.__add_results_dict(dic_res, snapshot)
 
-            for key in dfs:
-                dictRet[key] = self.__pd_to_dict_recur(
-                    dfs[key], level + 1, results_name
-                )
+            p_bar.update(start + results_subset.num_rows)
 
-        return dictRet
+        return True
 
     def add_results_np(self, results: np.array) -> bool:
         """
@@ -187,6 +194,37 @@ before doing this operation"
         self.add_results_df(df)
         return True
 
+    def get_results_dataframe(self) -> pd.DataFrame:
+        """
+        Download the model results as a dataframe: a sample_id column and
+        a column for each expected result, typed by the expected result type.
+        The results are downloaded by pages, with parallel requests.
+        """
+        snapshot = self.project.fetch_snapshot()
+        self.expected_results_exists(snapshot)
+
+        results_name = [r["name"] for r in snapshot.expected_results]
+        columns = utils.get_model_results_columns(
+            self.project.debiai_url, self.project.id, self.id, results_name
+        )
+        return utils.results_columns_to_df(columns, snapshot.expected_results)
+
+    def iter_results_dataframes(self):
+        """
+        Yield the model results, one dataframe per downloaded page,
+        only a few pages are kept in memory at the same time.
+        See get_results_dataframe for the columns.
+        """
+        snapshot = self.project.fetch_snapshot()
+        self.expected_results_exists(snapshot)
+
+        expected_results = snapshot.expected_results
+        results_name = [r["name"] for r in expected_results]
+        for page in utils.iter_model_results_columns(
+            self.project.debiai_url, self.project.id, self.id, results_name
+        ):
+            yield utils.results_columns_to_df(page, expected_results)
+
     def __checkResultDict(
         self,
         block,
@@ -1,21 +1,80 @@
-import pandas as pd
-import numpy as np
-from typing import List, Union
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
 
 # Models
 from .debiai_model import Debiai_model
 from .debiai_selection import Debiai_selection
+from .debiai_uploader import Debiai_uploader
+from .debiai_spool import Debiai_spool, DEFAULT_DRAIN_INTERVAL
+from .config import get_config
 
 # Services
-import utils as utils
-from .debiai_services.df_to_dict_tree import df_to_dict_tree, DEBIAI_TYPES
-from .debiai_services.np_to_dict import check_np_array, np_to_dict
+from . import utils
+from .debiai_services.lazy_import import LazyModule
+from .debiai_services.df_to_dict_tree import (
+    df_to_dict_tree,
+    df_to_json_tree,
+    root_block_chunks,
+    check_df_columns,
+    get_required_columns,
+    DEBIAI_TYPES,
+)
+from .debiai_services.np_to_dict import check_np_array
+from .debiai_services.np_chunks import (
+    np_samples_chunks,
+    np_rows_to_df,
+    npz_array_header,
+    iter_npz_rows,
+)
+from .debiai_services.validation import validate_samples_df
+from .debiai_services.arrow import (
+    import_pyarrow,
+    check_arrow_table,
+    samples_columns_to_arrow,
+)
+from .debiai_services.sample_ids import check_samples_id
+from .debiai_services.samples_index import (
+    create_samples_index,
+    filter_known_samples,
+    update_samples_index,
+)
 import json
 
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
+SAMPLES_FILE_FORMATS = ["csv", "parquet", "npy", "npz"]
+
+
+class Project_snapshot(NamedTuple):
+    """
+    The project metadata, as last fetched from DebiAI or modified by the project
+    A snapshot is never modified: the project swaps it for a new one, a thread
+    reading a snapshot sees a consistent block structure, expected results and
+    models, whatever the other threads do
+    """
+
+    block_structure: Optional[List[dict]] = None
+    expected_results: Optional[List[dict]] = None
+    models: Optional[List[dict]] = None
+    # {model name: model ID}
+    models_by_name: Optional[Dict[str, str]] = None
+    creation_date: Optional[int] = None
+    update_date: Optional[int] = None
+
 
 class Debiai_project:
     """
     A Debiai project
+
+    A project can be shared by threads: its metadata (block_structure,
+    expected_results, models...) are read from an immutable snapshot, swapped
+    atomically, and its modifications are serialized by a lock
     """
 
     def __init__(self, name: str, id: str, debiai_url: str):
@@ -23,12 +82,26 @@ class Debiai_project:
         self.id = id
         self.debiai_url = debiai_url
 
-        self.block_structure = None
-        self.expected_results = None
-
-        self.models = None
-        self.creation_date = None
-        self.update_date = None
+        self._snapshot = Project_snapshot()
+        # Held by the metadata fetches and modifications
+        self._lock = threading.RLock()
+        # Number of metadata fetches started, the concurrent fetches share the
+        # same request
+        self._nb_fetches = 0
+        self._project_info = None
+
+        # Held by the samples index and samples cache updates
+        self._samples_lock = threading.RLock()
+        # Hashes of the project samples block paths and values, see add_samples_pd
+        self._samples_index = None
+        # Downloaded samples indexed by sample_id, see get_selections_dataframes
+        self._samples_cache = None
+        # Name index of the project selections,
+        # loaded on first use and updated on creation and deletion
+        self._selections_by_name = None
+        # Optional write-ahead spool of the uploads, see set_spool
+        self.spool = None
+        self._owned_spool = False
 
         self.project_infos()  # Load block_structure & expected_results
 
@@ -47,30 +120,95 @@ class Debiai_project:
             + "\n"
         )
 
-    def project_infos(self):
-        project_info = utils.get_project(self.debiai_url, self.id)
-        if "blockLevelInfo" in project_info:
-            self.block_structure = project_info["blockLevelInfo"]
-        if "resultStructure" in project_info:
-            self.expected_results = project_info["resultStructure"]
-        if "models" in project_info:
-            self.models = project_info["models"]
-        if "creationDate" in project_info:
-            self.creation_date = project_info["creationDate"]
-        if "updateDate" in project_info:
-            self.update_date = project_info["updateDate"]
-        return project_info
+    # Metadata
+    @property
+    def snapshot(self) -> Project_snapshot:
+        """The current project metadata snapshot, without any request"""
+        return self._snapshot
+
+    @property
+    def block_structure(self) -> Optional[List[dict]]:
+        return self._snapshot.block_structure
+
+    @property
+    def expected_results(self) -> Optional[List[dict]]:
+        return self._snapshot.expected_results
+
+    @property
+    def models(self) -> Optional[List[dict]]:
+        return self._snapshot.models
+
+    @property
+    def creation_date(self) -> Optional[int]:
+        return self._snapshot.creation_date
+
+    @property
+    def update_date(self) -> Optional[int]:
+        return self._snapshot.update_date
+
+    def _update_snapshot(self, **changes) -> Project_snapshot:
+        """Swap the snapshot for a copy with the given changes"""
+        with self._lock:
+            self._snapshot = self._snapshot._replace(**changes)
+            # The last fetched project infos are outdated
+            self._project_info = None
+            return self._snapshot
+
+    def project_infos(self) -> dict:
+        """
+        Fetch the project from DebiAI and swap the metadata snapshot
+        Threads calling it while another one is fetching wait for that fetch
+        and share its result, instead of sending their own request.
+        Only a fetch started after the call is shared: its result includes the
+        modifications made before the call.
+        """
+        nb_fetches = self._nb_fetches
+        with self._lock:
+            if self._nb_fetches != nb_fetches and self._project_info is not None:
+                return self._project_info
+
+            self._nb_fetches += 1
+            # Not shared if the request fails
+            self._project_info = None
+            project_info = utils.get_project(self.debiai_url, self.id)
+            changes = {}
+            if "blockLevelInfo" in project_info:
+                changes["block_structure"] = project_info["blockLevelInfo"]
+            if "resultStructure" in project_info:
+                changes["expected_results"] = project_info["resultStructure"]
+            if "models" in project_info:
+                changes["models"] = project_info["models"]
+                changes["models_by_name"] = {
+                    m["name"]: m["id"] for m in project_info["models"]
+                }
+            if "creationDate" in project_info:
+                changes["creation_date"] = project_info["creationDate"]
+            if "updateDate" in project_info:
+                changes["update_date"] = project_info["updateDate"]
+            self._update_snapshot(**changes)
+
+            self._project_info = project_info
+            return project_info
+
+    def fetch_snapshot(self) -> Project_snapshot:
+        """
+        Fetch the project from DebiAI, return the new metadata snapshot
+        (or a newer one, swapped by another thread in the meantime)
+        """
+        self.project_infos()
+        return self._snapshot
 
     # Blocks structure
     def block_structure_defined(self):
-        self.project_infos()
-        if self.block_structure:
-            return self.block_structure
+        block_structure = self.fetch_snapshot().block_structure
+        if block_structure:
+            return block_structure
         else:
             return False
 
     def get_block_structure(self):
-        bs = self.block_structure_defined()
+        # A block structure can't be changed once set, it is fetched until then
+        bs = self.block_structure or self.block_structure_defined()
         if bs:
             return bs
         else:
@@ -137,6 +275,10 @@ class Debiai_project:
         At least one block is required
         """
 
+        with self._lock:
+            self.__set_blockstructure(block_structure)
+
+    def __set_blockstructure(self, block_structure: List[dict]):
         valid_types = ["text", "number", "boolean", "list", "dict"]
 
         # Check if blockLevel structure is already created
@@ -206,13 +348,14 @@ class Debiai_project:
 
         # Set the block_structure
         utils.add_blocklevel(self.debiai_url, self.id, block_structure)
-        self.block_structure = block_structure
+        self._update_snapshot(block_structure=block_structure)
+        self._forget_samples()
 
     # Results structure
     def expected_results_defined(self):
-        self.project_infos()
-        if self.expected_results:
-            return self.expected_results
+        expected_results = self.fetch_snapshot().expected_results
+        if expected_results:
+            return expected_results
         else:
             return False
 
@@ -228,6 +371,10 @@ class Debiai_project:
             )
 
     def set_expected_results(self, expected_results: List[dict]) -> List[dict]:
+        with self._lock:
+            return self.__set_expected_results(expected_results)
+
+    def __set_expected_results(self, expected_results: List[dict]) -> List[dict]:
         if self.expected_results is not None:
             raise ValueError("The project expected results have been already set")
 
@@ -258,9 +405,13 @@ class Debiai_project:
             expResults.append(newRes)
 
         utils.post_expected_results(self.debiai_url, self.id, expResults)
-        self.expected_results = expResults
+        self._update_snapshot(expected_results=expResults)
 
     def add_expected_result(self, column: dict) -> List[dict]:
+        with self._lock:
+            return self.__add_expected_result(column)
+
+    def __add_expected_result(self, column: dict) -> List[dict]:
         if self.expected_results is None:
             raise ValueError("The project does not have an expected results to update")
 
@@ -290,21 +441,26 @@ class Debiai_project:
         }
 
         ret = utils.post_add_expected_results(self.debiai_url, self.id, newRes)
-        self.expected_results = ret
+        self._update_snapshot(expected_results=ret)
         return ret
 
     def remove_expected_result(self, column: str) -> List[dict]:
-        if self.expected_results is None:
-            raise ValueError("The project does not have an expected results to update")
+        with self._lock:
+            if self.expected_results is None:
+                raise ValueError(
+                    "The project does not have an expected results to update"
+                )
 
-        # TODO check default type same as col type
+            # TODO check default type same as col type
 
-        ret = utils.remove_expected_results(self.debiai_url, self.id, column)
-        self.expected_results = ret
-        return ret
+            ret = utils.remove_expected_results(self.debiai_url, self.id, column)
+            self._update_snapshot(expected_results=ret)
+            return ret
 
     # Add samples
-    def add_samples(self, samples: np.array) -> bool:
+    def add_samples(
+        self, samples: np.array, processes: int = None, columns: List[str] = None
+    ) -> bool:
         """
         Add samples to the current project, based on his block structure.
         The defined block structure elements have to be present in the numpy array
@@ -321,34 +477,73 @@ class Debiai_project:
 
         If one the the required labels are missing, the samples wont be uploaded.
         Any labels that aren't required will be ignored
-        """
-
-        self.get_block_structure()  # Check that the block_structure has been set
 
-        # Check that the array is correct and create a column index map
-        indexMap = check_np_array(self.block_structure, samples)
+        The labels can also be given apart from the values, the values then keep
+        their numpy types:
+            columns: the labels of the array columns, the array has no label row
+            or a numpy structured array, its fields names are the labels
 
-        SAMPLE_CHUNK_SIZE = 5000  # Number of sample that will be added in one chunk
-        SAMPLE_TO_UPLOAD = samples.shape[0] - 1
+        processes: convert the samples with this number of processes,
+            see add_samples_pd
 
-        p_bar = utils.progress_bar("Adding samples", SAMPLE_TO_UPLOAD)
-        nb_sample_added = 0
-
-        while nb_sample_added < SAMPLE_TO_UPLOAD:
-            np_to_add = samples[
-                nb_sample_added + 1 : nb_sample_added + 1 + SAMPLE_CHUNK_SIZE  # noqa
-            ]
-
-            dict_to_add = np_to_dict(self.block_structure, np_to_add, indexMap)
-
-            utils.post_add_tree(self.debiai_url, self.id, dict_to_add)
+        The values of every chunk are validated before the first upload, except
+        for a memory mapped array (np.memmap, np.load(mmap_mode="r")): it is
+        validated chunk by chunk, as it is uploaded.
+        """
 
-            nb_sample_added += SAMPLE_CHUNK_SIZE
-            p_bar.update(min([nb_sample_added, SAMPLE_TO_UPLOAD]))
+        self.get_block_structure()  # Check that the block_structure has been set
 
+        if not isinstance(samples, np.ndarray):
+            raise TypeError("The samples must be a numpy array")
+
+        # The array is read by chunks, a memory mapped array is never fully loaded
+        chunk_size = get_config().upload_chunk_size
+        chunk_size *= 1 if processes is None else 2 * processes
+        nb_samples, chunks = self.__np_samples_chunks(samples, columns, chunk_size)
+        if nb_samples <= 0:
+            return True
+
+        p_bar = utils.progress_bar("Adding samples", nb_samples)
+        self.__add_samples_dfs(
+            chunks,
+            None,
+            p_bar,
+            processes=processes,
+            validate_first=not isinstance(samples, np.memmap),
+        )
         return True
 
-    def add_samples_pd(self, df: pd.DataFrame) -> bool:
+    def __np_samples_chunks(
+        self, samples: np.ndarray, columns: List[str], chunk_size: int
+    ):
+        """
+        Check the array labels, see add_samples,
+        return the number of samples and an iterator of dataframes of samples
+        """
+        if samples.dtype.names is not None:
+            indexMap = check_np_array(
+                self.block_structure, samples, list(samples.dtype.names)
+            )
+            start = 0
+        else:
+            if columns is not None and (
+                samples.ndim != 2 or samples.shape[1] != len(columns)
+            ):
+                raise ValueError(
+                    "The samples array must have one column per given column name"
+                )
+            indexMap = check_np_array(self.block_structure, samples, columns)
+            start = 0 if columns is not None else 1
+
+        nb_samples = samples.shape[0] - start
+        return nb_samples, np_samples_chunks(samples, indexMap, chunk_size, start)
+
+    def add_samples_pd(
+        self,
+        df: pd.DataFrame,
+        mode: str = None,
+        processes: int = None,
+    ) -> bool:
         """
         Add samples to the current project, based on its block structure.
         The defined block structure elements have to be present in the samples dataframe
@@ -365,6 +560,20 @@ class Debiai_project:
 
         If one the the required labels are missing, the samples wont be uploaded.
         Any labels that aren't required will be ignored
+
+        mode:
+            None : all the samples are uploaded, the backend merges them
+            "skip_existing" : only the samples that aren't in the project are uploaded
+
+        The samples are compared by block path (block_1 / block_2 / samples) with
+        an index of the project samples hashes. The index is created from the
+        project samples the first time a mode is used, then kept up to date locally.
+
+        processes: convert the samples to the block tree with this number of
+            processes, the samples are split by root block. The conversion is
+            CPU bound, use it for large dataframes on a machine with several
+            cores. The processes are spawned, they import the debiai module
+            again: a script using it needs an `if __name__ == "__main__":` guard.
         """
 
         self.get_block_structure()  # Check that the block_structure has been set
@@ -376,43 +585,481 @@ class Debiai_project:
         if df.empty:
             return False
 
-        SAMPLE_CHUNK_SIZE = 5000  # Number of sample that will be added in one chunk
-        SAMPLE_TO_UPLOAD = df.shape[0]
-        p_bar = utils.progress_bar("Adding samples", SAMPLE_TO_UPLOAD)
+        p_bar = utils.progress_bar("Adding samples", df.shape[0])
+        self.__add_samples_dfs([df], mode, p_bar, processes=processes)
+        return True
+
+    def add_samples_iter(
+        self, samples: Iterable, columns: List[str] = None, mode: str = None
+    ) -> bool:
+        """
+        Add samples to the current project from an iterable of dataframes
+        or of records, without holding all the samples in memory.
 
-        nb_sample_added = 0
+        The records can be dicts ({column: value}) or sequences of values, the
+        columns names are then required. A database cursor can be used directly:
+            project.add_samples_iter(cursor, [d[0] for d in cursor.description])
 
-        while nb_sample_added < SAMPLE_TO_UPLOAD:
-            df_to_add = df[
-                nb_sample_added : nb_sample_added + SAMPLE_CHUNK_SIZE  # noqa
-            ]
-            dict_to_add = df_to_dict_tree(df_to_add, self.block_structure)
+        The records are grouped in chunks, each chunk is validated, converted and
+        uploaded before the next one is read: an invalid value stops the upload,
+        the previous chunks stay uploaded. See add_samples_pd for the columns
+        and mode.
+        """
+
+        self.get_block_structure()  # Check that the block_structure has been set
+
+        p_bar = utils.progress_bar("Adding samples", None)
+        self.__add_samples_dfs(self.__samples_chunks(samples, columns), mode, p_bar)
+        p_bar.end()
+        return True
+
+    def add_samples_from_file(
+        self, path: str, format: str = None, mode: str = None, **read_options
+    ) -> bool:
+        """
+        Add samples to the current project from a csv, parquet, npy or npz file.
+        The file is read chunk by chunk, so it doesn't need to fit in memory.
+        Only the block structure columns are read.
+
+        format: "csv", "parquet", "npy" or "npz",
+            guessed from the file extension if not given
+        read_options: passed to pandas.read_csv for csv files
+        Reading parquet files requires pyarrow.
+
+        npy and npz files contain an array as given to add_samples, the labels
+        are in its first row, in a columns read option, or it is a structured
+        array. The other read options are passed to numpy.load.
+            npy: the array is memory mapped, an array of Python objects, like an
+                array with a labels row, needs mmap_mode=None, allow_pickle=True
+            npz: key: the name of the array, needed if the file has several.
+                The array is read by chunks from the file, compressed or not,
+                unless it has Python objects or is in Fortran order.
+
+        The chunks are validated and uploaded one by one, see add_samples_iter.
+        See add_samples_pd for the columns and mode.
+        """
+
+        block_structure = self.get_block_structure()
+        required_columns = get_required_columns(block_structure)
+
+        if format is None:
+            format = os.path.splitext(path)[1].lstrip(".").lower()
+        if format not in SAMPLES_FILE_FORMATS:
+            raise ValueError(
+                "Unknown samples file format '"
+                + str(format)
+                + "', use one of : "
+                + str(SAMPLES_FILE_FORMATS)
+            )
+
+        if format == "csv":
+            # The dtypes are inferred by chunk: the blocks names are read as text,
+            # so that a block isn't read as 1 in a chunk and as 1.0 in another one
+            dtype = read_options.pop("dtype", None)
+            if dtype is None or isinstance(dtype, dict):
+                blocks_dtype = {block["name"]: str for block in block_structure}
+                dtype = {**blocks_dtype, **(dtype or {})}
+            chunks = pd.read_csv(
+                path,
+                usecols=lambda c: c in required_columns,
+                chunksize=get_config().upload_chunk_size,
+                dtype=dtype,
+                **read_options,
+            )
+        elif format in ("npy", "npz"):
+            chunks = self.__np_file_chunks(path, format, read_options)
+        else:
+            import_pyarrow()
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(path)
+            check_df_columns(parquet_file.schema_arrow.names, block_structure)
+            chunks = (
+                batch.to_pandas()
+                for batch in parquet_file.iter_batches(
+                    batch_size=get_config().upload_chunk_size,
+                    columns=required_columns,
+                )
+            )
 
-            utils.post_add_tree(self.debiai_url, self.id, dict_to_add)
-            nb_sample_added += SAMPLE_CHUNK_SIZE
-            p_bar.update(min([nb_sample_added, SAMPLE_TO_UPLOAD]))
+        return self.add_samples_iter(chunks, mode=mode)
+
+    def __np_file_chunks(self, path: str, format: str, read_options: dict):
+        """Return an iterator of dataframes of the samples of a npy or npz file"""
+        columns = read_options.pop("columns", None)
+        chunk_size = get_config().upload_chunk_size
+
+        if format == "npy":
+            read_options.setdefault("mmap_mode", "r")
+            samples = np.load(path, **read_options)
+            return self.__np_samples_chunks(samples, columns, chunk_size)[1]
+
+        key = read_options.pop("key", None)
+        with np.load(path, **read_options) as npz_file:
+            if key is None:
+                if len(npz_file.files) != 1:
+                    raise ValueError(
+                        "The npz file has several arrays, give the key of the "
+                        + "samples array, one of : "
+                        + str(npz_file.files)
+                    )
+                key = npz_file.files[0]
+
+            shape, fortran_order, dtype = npz_array_header(path, key)
+            if fortran_order or dtype.hasobject:
+                samples = npz_file[key]
+                return self.__np_samples_chunks(samples, columns, chunk_size)[1]
+
+        if dtype.names is not None:
+            columns = list(dtype.names)
+        elif columns is None:
+            raise ValueError("The columns are required for an array without labels")
+        elif len(shape) != 2 or shape[1] != len(columns):
+            raise ValueError(
+                "The samples array must have one column per given column name"
+            )
+        indexMap = check_np_array(self.block_structure, None, columns)
+
+        return (
+            np_rows_to_df(rows, indexMap)
+            for rows in iter_npz_rows(path, key, chunk_size)
+        )
+
+    def add_samples_arrow(self, table) -> bool:
+        """
+        Add samples to the current project from a pyarrow Table.
+        The table is uploaded by slices, the block structure columns of each slice
+        are converted to a DataFrame, then validated and uploaded like the
+        add_samples_pd samples: every slice is validated before the first upload.
+        See add_samples_pd for the expected columns.
+        """
+
+        block_structure = self.get_block_structure()
+
+        check_arrow_table(table)
+        if table.num_rows == 0:
+            return False
+
+        check_df_columns(table.column_names, block_structure)
+
+        columns = list(dict.fromkeys(get_required_columns(block_structure)))
+        chunk_size = get_config().upload_chunk_size
+        chunks = (
+            table.slice(start, chunk_size).select(columns).to_pandas()
+            for start in range(0, table.num_rows, chunk_size)
+        )
 
+        p_bar = utils.progress_bar("Adding samples", table.num_rows)
+        self.__add_samples_dfs(chunks, None, p_bar, validate_first=True)
         return True
 
+    def __samples_chunks(self, samples: Iterable, columns: List[str] = None):
+        """
+        Yield dataframes from an iterable of dataframes or of records,
+        records are grouped by upload_chunk_size
+        """
+        chunk_size = get_config().upload_chunk_size
+        records = []
+        for sample in samples:
+            if isinstance(sample, pd.DataFrame):
+                if records:
+                    yield pd.DataFrame(records, columns=columns)
+                    records = []
+                yield sample
+                continue
+
+            if not isinstance(sample, dict) and columns is None:
+                raise ValueError(
+                    "The columns names are required to add samples from "
+                    + type(sample).__name__
+                    + " records"
+                )
+
+            records.append(sample)
+            if len(records) == chunk_size:
+                yield pd.DataFrame(records, columns=columns)
+                records = []
+
+        if records:
+            yield pd.DataFrame(records, columns=columns)
+
+    def __add_samples_dfs(
+        self,
+        dfs: Iterable,
+        mode: str,
+        p_bar,
+        processes: int = None,
+        validate_first: bool = False,
+    ):
+        """
+        Upload dataframes of samples, chunk by chunk
+        With a mode, the samples already in the project are filtered out first
+        With processes, the chunks are converted by a pool of processes
+        With validate_first, every chunk is validated before the first upload,
+        the validated chunks are kept in memory. Otherwise each chunk is validated
+        just before its upload.
+        """
+        if mode is None:
+            # The uploaded samples aren't tracked by the samples index
+            self._forget_samples()
+            samples_lock = contextlib.nullcontext()
+        else:
+            # The uploads with a mode are serialized, each one filters its samples
+            # with the samples index updated by the previous ones
+            samples_lock = self._samples_lock
+
+        dfs = self.__validated_dfs(dfs, uploading=not validate_first)
+        if validate_first:
+            dfs = list(dfs)
+
+        with samples_lock:
+            self.__upload_samples_dfs(dfs, mode, p_bar, processes)
+
+    def __validated_dfs(self, dfs: Iterable, uploading: bool):
+        """
+        Check and validate the dataframes of samples, the invalid rows are
+        reported by their position in all the samples
+        uploading: the previous dataframes are uploaded while the next ones are
+            validated, the error says it
+        """
+        first_row = 0
+        for df in dfs:
+            if df.empty:
+                continue
+
+            check_df_columns(list(df.columns), self.block_structure)
+            try:
+                yield validate_samples_df(df, self.block_structure, first_row)
+            except ValueError as e:
+                if uploading and first_row > 0:
+                    raise ValueError(
+                        str(e)
+                        + "\nThe "
+                        + str(first_row)
+                        + " samples of the previous chunks were already uploaded"
+                    ) from None
+                raise
+            first_row += df.shape[0]
+
+    def __upload_samples_dfs(self, dfs: Iterable, mode: str, p_bar, processes: int):
+        if mode is not None:
+            self.get_samples_index()
+            self._samples_cache = None
+
+        pool = None
+        if processes is not None:
+            # Imported on use, multiprocessing is slow to import
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forked processes would copy the locks of the uploader and spool
+            # threads, maybe in a locked state: the processes are spawned
+            pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+            )
+
+        try:
+            nb_sample_processed = 0
+            for df in dfs:
+                nb_rows = df.shape[0]
+
+                if mode is not None:
+                    # Only keep the samples that need to be uploaded
+                    df, new_index = filter_known_samples(
+                        df, self.block_structure, self._samples_index, mode
+                    )
+
+                if pool is None:
+                    self.__upload_samples_df(df, p_bar, nb_sample_processed)
+                else:
+                    self.__upload_samples_df_pool(
+                        df, pool, 2 * processes, p_bar, nb_sample_processed
+                    )
+
+                if mode is not None:
+                    self._samples_index = update_samples_index(
+                        self._samples_index, new_index
+                    )
+
+                nb_sample_processed += nb_rows
+                p_bar.update(nb_sample_processed)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def __upload_samples_df(self, df: pd.DataFrame, p_bar, nb_sample_processed: int):
+        """Convert and upload a dataframe of samples, chunk by chunk"""
+        chunk_size = get_config().upload_chunk_size
+        for start in range(0, df.shape[0], chunk_size):
+            df_to_add = df.iloc[start : start + chunk_size]  # noqa
+            dict_to_add = df_to_dict_tree(df_to_add, self.block_structure)
+
+            self._post_add_tree(dict_to_add)
+            if start + chunk_size < df.shape[0]:
+                p_bar.update(nb_sample_processed + start + chunk_size)
+
+    def __upload_samples_df_pool(
+        self, df: pd.DataFrame, pool, nb_ahead: int, p_bar, nb_sample_processed: int
+    ):
+        """
+        Convert a dataframe of samples with a pool of processes, then upload it
+        The chunks are cut at the root blocks boundaries, the processes receive
+        the chunks columns arrays and return the block trees as JSON bytes.
+        nb_ahead chunks are converted ahead of the upload.
+        """
+        columns = list(dict.fromkeys(get_required_columns(self.block_structure)))
+        chunk_size = get_config().upload_chunk_size
+        nb_samples_end = nb_sample_processed + df.shape[0]
+        pending = deque()
+
+        def upload_next():
+            nonlocal nb_sample_processed
+            tree_future, nb_rows = pending.popleft()
+            self._post_add_tree_json(tree_future.result())
+            nb_sample_processed += nb_rows
+            if nb_sample_processed < nb_samples_end:
+                p_bar.update(nb_sample_processed)
+
+        for chunk in root_block_chunks(df, self.block_structure, chunk_size):
+            chunk_columns = {name: chunk[name].to_numpy() for name in columns}
+            tree_future = pool.submit(
+                df_to_json_tree, chunk_columns, self.block_structure
+            )
+            pending.append((tree_future, chunk.shape[0]))
+            if len(pending) >= nb_ahead:
+                upload_next()
+
+        while pending:
+            upload_next()
+
+    def set_spool(
+        self,
+        spool: Union[str, Debiai_spool, None],
+        drain_interval: float = DEFAULT_DRAIN_INTERVAL,
+    ) -> Union[Debiai_spool, None]:
+        """
+        Write the samples and results uploads to a durable spool before sending
+        them: when the backend can't be reached, the uploads stay in the spool
+        and are replayed in order later, see flush_spool. The uploads refused by
+        the backend are set aside, see Debiai_spool.refused_chunks.
+
+        spool: a spool directory, a Debiai_spool shared with other projects,
+            or None to send the uploads directly again
+        drain_interval: the seconds between two replays of the pending uploads
+            while the backend can't be reached, for a spool directory path
+
+        A spool created from a directory path is closed when it is replaced.
+        """
+        owned_spool = isinstance(spool, str)
+        if not owned_spool and spool is not None:
+            if not isinstance(spool, Debiai_spool):
+                raise TypeError("The spool must be a directory path or a Debiai_spool")
+
+        if self.spool is not None and self._owned_spool:
+            self.spool.close()
+        if owned_spool:
+            spool = Debiai_spool(spool, drain_interval)
+        self.spool = spool
+        self._owned_spool = owned_spool
+        return spool
+
+    def flush_spool(self) -> int:
+        """
+        Replay the spooled uploads until the backend can't be reached,
+        return the number of uploads still pending
+        """
+        if self.spool is None:
+            raise ValueError("The project has no spool, see set_spool")
+        return self.spool.flush()
+
+    def _post_add_tree(self, tree: list):
+        if self.spool is not None:
+            self.spool.add_tree(self.debiai_url, self.id, tree)
+        else:
+            utils.post_add_tree(self.debiai_url, self.id, tree)
+
+    def _post_add_tree_json(self, tree_json: bytes):
+        if self.spool is not None:
+            self.spool.add_tree_json(self.debiai_url, self.id, tree_json)
+        else:
+            utils.post_add_tree_json(self.debiai_url, self.id, tree_json)
+
+    def _post_model_results_dict(
+        self, model_id: str, results: dict, expected_results_order: List[str]
+    ) -> bool:
+        if self.spool is not None:
+            self.spool.add_results_dict(
+                self.debiai_url, self.id, model_id, results, expected_results_order
+            )
+            return True
+        return utils.post_model_results_dict(
+            self.debiai_url, self.id, model_id, results, expected_results_order
+        )
+
+    def uploader(
+        self, max_queue_bytes: int = None, max_workers: int = None
+    ) -> Debiai_uploader:
+        """
+        Return a background uploader of samples and results: its add_samples and
+        add_results methods return a Future immediately, the dataframes are
+        coalesced into chunks and uploaded by threads, the configured
+        upload_linger seconds after the submission at most.
+        A submission blocks while the dataframes waiting to be uploaded take
+        more than max_queue_bytes, the configured max_queue_bytes by default.
+        Use it as a context manager or call close().
+        """
+        self.get_block_structure()  # Check that the block_structure has been set
+        return Debiai_uploader(self, max_queue_bytes, max_workers)
+
+    def get_samples_index(self, refresh: bool = False) -> pd.Index:
+        """
+        Return the index of the project samples used by add_samples_pd:
+        the hashes of the samples block paths.
+        The index is created from the project samples on the first call,
+        use refresh=True to recreate it if the project has been modified elsewhere.
+        """
+        with self._samples_lock:
+            if self._samples_index is None or refresh:
+                block_structure = self.get_block_structure()
+                # Only the blocks names are hashed
+                columns = utils.get_project_samples_columns(
+                    self.debiai_url,
+                    self.id,
+                    block_structure,
+                    projection=[block["name"] for block in block_structure],
+                )
+                self._samples_index = create_samples_index(
+                    pd.DataFrame(columns), block_structure
+                )
+
+            return self._samples_index
+
+    def _forget_samples(self):
+        """Drop the samples index and cache, the project samples have changed"""
+        with self._samples_lock:
+            self._samples_index = None
+            self._samples_cache = None
+
     # Models
     def get_models(self) -> List[Debiai_model]:
-        self.project_infos()
-        if self.models:
-            return self.models
+        models = self.fetch_snapshot().models
+        if models:
+            return models
         else:
             return []
 
     def get_model(self, model_name: str) -> Union[Debiai_model, None]:
-        self.project_infos()
-        for model in self.models:
-            id = model["id"]
-            name = model["name"]
-            if name == model_name:
-                return Debiai_model(self, id, name)
+        # The models are listed again only if the model isn't known yet
+        models_by_name = self._snapshot.models_by_name
+        if models_by_name is None or model_name not in models_by_name:
+            models_by_name = self.fetch_snapshot().models_by_name
+
+        if models_by_name and model_name in models_by_name:
+            return Debiai_model(self, model_name, models_by_name[model_name])
         return None
 
     def create_model(self, name: str, metadata: dict = {}) -> Debiai_model:
-        #  check parameters
+        #  check parameters
         if not name:
             raise ValueError("Can't create the model: The model name is required")
 
@@ -422,13 +1069,17 @@ class Debiai_project:
             raise ValueError("The metadata dictionary is not JSON serializable")
 
         # Call the backend
-        if utils.post_model(self.debiai_url, self.id, name, metadata):
-            return Debiai_model(self, name, name, metadata)
-        else:
+        if not utils.post_model(self.debiai_url, self.id, name, metadata):
             return False
 
+        # The model ID is given by DebiAI
+        models_by_name = self.fetch_snapshot().models_by_name or {}
+        if name not in models_by_name:
+            raise ValueError("The model '" + name + "' hasn't been created")
+        return Debiai_model(self, name, models_by_name[name], metadata)
+
     def delete_model(self, model_name: str) -> bool:
-        #  check parameters
+        #  check parameters
         if not model_name:
             raise ValueError("Can't delete the model: The model name is required")
         # Find the model ID
@@ -437,11 +1088,15 @@ class Debiai_project:
             raise ValueError("The model '" + model_name + "' does not exist")
 
         # Call the backend
-        utils.delete_model(self.debiai_url, self.id, model.id)
+        with self._lock:
+            utils.delete_model(self.debiai_url, self.id, model.id)
+            models_by_name = dict(self._snapshot.models_by_name or {})
+            models_by_name.pop(model_name, None)
+            self._update_snapshot(models_by_name=models_by_name)
 
     # Selections
     def create_selection(
-        self, selection_name: str, samples_id: List[str]
+        self, selection_name: str, samples_id: Union[List[str], np.ndarray, pd.Series]
     ) -> Debiai_selection:
         """
         Create a selection of samples from an ID list provided by Debiai
@@ -450,9 +1105,13 @@ class Debiai_project:
 
         You can get the samples ID list with the get_dataframe method
 
+        Large selections are streamed to the backend by chunks, a numpy array of
+        strings (or the "sample_id" Series of a dataframe) avoids creating
+        a Python list of millions of strings.
+
         params:
             selection_name : str : the name of the selection
-            samples_id : list : the list of samples ID hash
+            samples_id : list, np.ndarray or pd.Series : the list of samples ID hash
 
         return:
             Debiai_selection : the created selection
@@ -460,25 +1119,85 @@ class Debiai_project:
         # Check the parameters
         if not selection_name:
             raise ValueError("The selection name is required")
-        if not samples_id:
-            raise ValueError("The samples ID list is required")
-        if not isinstance(samples_id, list):
-            raise TypeError("The samples ID list must be a list")
-        if not all(isinstance(i, str) for i in samples_id):
-            raise ValueError("The samples ID list must be a list of strings")
+        samples_id = check_samples_id(samples_id)
 
         # Call the backend
         new_selection = utils.post_selection(
             self.debiai_url, self.id, selection_name, samples_id
         )
 
-        return Debiai_selection(
+        selection = Debiai_selection(
             self,
             name=selection_name,
             id=new_selection["id"],
             creationDate=new_selection["creationDate"],
             nbSamples=len(samples_id),
         )
+        self.__update_selections_index({selection_name: selection})
+        return selection
+
+    def create_selection_from_mask(
+        self, selection_name: str, df: pd.DataFrame, mask
+    ) -> Debiai_selection:
+        """
+        Create a selection with the samples of a dataframe matching a mask
+
+        params:
+            selection_name : str : the name of the selection
+            df : pd.DataFrame : project samples, with their "sample_id" column
+            mask : boolean Series or array, aligned with df
+
+        Example:
+            df = project.get_dataframe()
+            project.create_selection_from_mask("High GDT", df, df["GDT"] > 10)
+        """
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("The samples must be a pandas DataFrame")
+        if "sample_id" not in df.columns:
+            raise ValueError("The 'sample_id' column is missing from the dataframe")
+
+        if isinstance(mask, pd.Series):
+            samples_id = df.loc[mask, "sample_id"].to_numpy()
+        else:
+            samples_id = df["sample_id"].to_numpy()[np.asarray(mask, dtype=bool)]
+
+        return self.create_selection(selection_name, samples_id)
+
+    def create_selection_from_query(
+        self, selection_name: str, expr: str, columns: List[str] = None
+    ) -> Debiai_selection:
+        """
+        Create a selection with the project samples matching a pandas query
+
+        The project samples are downloaded page by page, the query is evaluated
+        on each page and only the matching samples ID are kept, the project
+        dataframe is never created.
+
+        params:
+            selection_name : str : the name of the selection
+            expr : str : the query, see pandas.DataFrame.query
+            columns : list : the columns used by the query, by default the
+                columns named in the query
+
+        Example:
+            project.create_selection_from_query("High GDT", "`My GDT` > 10")
+        """
+        block_structure = self.get_block_structure()
+
+        if columns is None:
+            columns_names = utils.get_samples_columns_names(block_structure)
+            columns = [name for name in columns_names if name in expr]
+
+        pages_samples_id = [np.array([], dtype=str)]
+        for page_df in self.iter_dataframes(columns):
+            matching_samples = page_df.query(expr)
+            pages_samples_id.append(matching_samples["sample_id"].to_numpy(dtype=str))
+
+        samples_id = np.concatenate(pages_samples_id)
+        if len(samples_id) == 0:
+            raise ValueError("No sample matches the query '" + expr + "'")
+
+        return self.create_selection(selection_name, samples_id)
 
     def get_selections(self) -> List[Debiai_selection]:
         """
@@ -497,14 +1216,117 @@ class Debiai_project:
                     s["nbSamples"],
                 )
             )
+
+        # Refresh the selections name index
+        self._selections_by_name = {s.name: s for s in selections}
         return selections
 
+    def __update_selections_index(self, selections: Dict[str, Debiai_selection]):
+        """
+        Add selections to the name index, or remove them with None values
+        The index is replaced, never modified: the threads reading it
+        aren't disturbed
+        """
+        with self._lock:
+            if self._selections_by_name is None:
+                return
+            selections_by_name = dict(self._selections_by_name)
+            for name, selection in selections.items():
+                if selection is None:
+                    selections_by_name.pop(name, None)
+                else:
+                    selections_by_name[name] = selection
+            self._selections_by_name = selections_by_name
+
     def get_selection(self, selection_name: str) -> Union[Debiai_selection, None]:
-        selections = self.get_selections()
-        for selection in selections:
-            if selection.name == selection_name:
-                return selection
-        return None
+        return self.get_selections_by_name([selection_name])[0]
+
+    def get_selections_by_name(
+        self, selection_names: List[str]
+    ) -> List[Union[Debiai_selection, None]]:
+        """
+        Return the selections with the given names, None for the unknown ones.
+        The selections are found with the project selections name index,
+        they are listed again only if one of the names isn't in the index.
+        """
+        selections_by_name = self._selections_by_name
+        if selections_by_name is None or any(
+            name not in selections_by_name for name in selection_names
+        ):
+            self.get_selections()
+            selections_by_name = self._selections_by_name
+
+        return [selections_by_name.get(name) for name in selection_names]
+
+    def get_selections_dataframes(
+        self, selection_names: List[str]
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Return the samples of several selections, as a dict of dataframes
+        indexed by selection name.
+
+        The selections samples ID lists are fetched concurrently, then the samples
+        of all the selections are downloaded once, in parallel pages, and kept in
+        a cache shared by the following calls. Use clear_samples_cache to free it.
+        """
+        block_structure = self.get_block_structure()
+
+        selections = self.get_selections_by_name(selection_names)
+        for selection_name, selection in zip(selection_names, selections):
+            if selection is None:
+                raise ValueError(
+                    "The selection '" + selection_name + "' does not exist"
+                )
+
+        # Get the samples ID lists concurrently
+        selections_samples_id = utils.parallel_map(
+            lambda selection: selection.get_samples_id(), selections
+        )
+
+        # Download the samples that aren't in the cache yet, once
+        samples_id = [np.array([], dtype=str)]
+        for selection_samples_id in selections_samples_id:
+            samples_id.append(np.asarray(selection_samples_id, dtype=str))
+        samples_cache = self.__cache_samples(
+            pd.unique(np.concatenate(samples_id)), block_structure
+        )
+
+        block_names = [block["name"] for block in block_structure]
+        dataframes = {}
+        for selection, samples_id in zip(selections, selections_samples_id):
+            dataframe = samples_cache[samples_cache.index.isin(samples_id)]
+            dataframe = dataframe.reset_index().sort_values(by=block_names)
+            dataframes[selection.name] = dataframe
+        return dataframes
+
+    def clear_samples_cache(self):
+        """Free the samples downloaded by get_selections_dataframes"""
+        with self._samples_lock:
+            self._samples_cache = None
+
+    def __cache_samples(self, samples_id: np.ndarray, block_structure):
+        """
+        Add the missing samples to the samples cache and return it
+        The threads needing the same samples wait for a single download
+        """
+        with self._samples_lock:
+            samples_cache = self._samples_cache
+            if samples_cache is not None:
+                samples_id = samples_id[~pd.Index(samples_id).isin(samples_cache.index)]
+
+            if samples_cache is None or len(samples_id):
+                columns = utils.get_samples_columns_from_ids(
+                    self.debiai_url, self.id, samples_id, block_structure
+                )
+                new_samples = pd.DataFrame(columns).set_index("sample_id")
+
+                if samples_cache is None:
+                    samples_cache = new_samples
+                else:
+                    samples_cache = pd.concat([samples_cache, new_samples])
+                self._samples_cache = samples_cache
+
+            return samples_cache
 
     def delete_selection(self, selection_name: str) -> bool:
         #  check parameters
@@ -518,7 +1340,68 @@ class Debiai_project:
             raise ValueError("The selection '" + selection_name + "' does not exist")
 
         # Call the backend
-        return utils.delete_selection(self.debiai_url, self.id, selection.id)
+        deleted = utils.delete_selection(self.debiai_url, self.id, selection.id)
+        if deleted:
+            self.__update_selections_index({selection_name: None})
+        return deleted
+
+    def delete_selections(self, selection_names: List[str]) -> bool:
+        """
+        Delete several selections, the deletions are sent concurrently.
+        Raise an error listing the selections that couldn't be deleted.
+        """
+        selections = self.get_selections_by_name(selection_names)
+        missing = [n for n, s in zip(selection_names, selections) if s is None]
+        if missing:
+            raise ValueError("The selections " + str(missing) + " do not exist")
+
+        results = utils.parallel_map(
+            lambda s: utils.delete_selection(self.debiai_url, self.id, s.id),
+            selections,
+            return_exceptions=True,
+        )
+
+        errors = []
+        deleted = {}
+        for selection, result in zip(selections, results):
+            if result is True:
+                deleted[selection.name] = None
+            else:
+                errors.append("'" + selection.name + "': " + str(result))
+        self.__update_selections_index(deleted)
+
+        if errors:
+            raise ValueError(
+                "Some selections couldn't be deleted: " + ", ".join(errors)
+            )
+        return True
+
+    # Tags
+    def get_tags(self) -> List[dict]:
+        """Return the project tags list"""
+        return utils.get_tags(self.debiai_url, self.id)
+
+    def get_tag(self, tag_id: str) -> dict:
+        """Return a tag, with the tag value of each tagged sample ID"""
+        return utils.get_tag(self.debiai_url, self.id, tag_id)
+
+    def get_tag_dataframe(self, tag_id: str, tag_value) -> pd.DataFrame:
+        """
+        Return the samples tagged with the given value as a dataframe,
+        with the same columns as get_dataframe.
+        The tagged samples are downloaded by pages, with parallel requests.
+        """
+        block_structure = self.get_block_structure()
+
+        # Tag format : {"id": str, "name": str, "tags": {sample_id: tag_value}}
+        tag = self.get_tag(tag_id)
+        tag_values = pd.Series(tag["tags"], dtype=object)
+        samples_id = tag_values.index[tag_values.astype(str) == str(tag_value)]
+
+        columns = utils.get_samples_columns_from_ids(
+            self.debiai_url, self.id, samples_id, block_structure
+        )
+        return utils.samples_columns_to_df(columns, block_structure)
 
     # Pull data
     def get_dataframe(self) -> pd.DataFrame:
@@ -528,3 +1411,171 @@ class Debiai_project:
         samples = utils.get_project_samples(self.debiai_url, self.id, block_structure)
 
         return samples
+
+    def sample_dataframe(
+        self, n: int, stratify_by: str = None, seed: int = None
+    ) -> pd.DataFrame:
+        """
+        Return n random samples of the project as a dataframe,
+        with the same columns as get_dataframe.
+        The samples ID list is downloaded, the samples are drawn from it,
+        then only the drawn samples are downloaded.
+        With stratify_by, the blocks of a sample can't be known from its ID:
+        all the project samples are downloaded, by parallel pages, and the
+        drawn ones are kept.
+
+        params:
+            n : int : the number of samples, all the samples are returned
+                if the project has less than n samples
+            stratify_by : str : optional block name, the samples are then drawn
+                in each block of this level, proportionally to its size
+            seed : int : the random generator seed, for reproducible draws
+        """
+        if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+            raise ValueError("The number of samples must be a non-negative integer")
+
+        block_structure = self.get_block_structure()
+        rng = np.random.default_rng(seed)
+
+        if stratify_by is not None:
+            block_names = [block["name"] for block in block_structure]
+            if stratify_by not in block_names:
+                raise ValueError("'" + str(stratify_by) + "' is not a block name")
+
+        samples_id = np.array(
+            utils.get_project_samples_id(self.debiai_url, self.id), dtype=object
+        )
+
+        if stratify_by is None:
+            if n < len(samples_id):
+                samples_id = rng.choice(samples_id, n, replace=False)
+            columns = utils.get_samples_columns_from_ids(
+                self.debiai_url, self.id, samples_id, block_structure
+            )
+            return utils.samples_columns_to_df(columns, block_structure)
+
+        # Every sample is downloaded once, the drawn ones are kept
+        columns = utils.get_samples_columns_from_ids(
+            self.debiai_url, self.id, samples_id, block_structure
+        )
+        positions = self.__stratified_draw(
+            np.arange(len(columns["sample_id"])),
+            pd.factorize(pd.Series(columns[stratify_by], dtype=object))[0],
+            n,
+            rng,
+        )
+        columns = {
+            name: [values[i] for i in positions] for name, values in columns.items()
+        }
+        return utils.samples_columns_to_df(columns, block_structure)
+
+    @staticmethod
+    def __stratified_draw(
+        samples: np.ndarray, strata: np.ndarray, n: int, rng
+    ) -> np.ndarray:
+        """
+        Draw n samples without replacement, each stratum gets a number of
+        samples proportional to its size (largest remainder rounding)
+        """
+        if n >= len(samples):
+            return samples
+
+        sizes = np.bincount(strata)
+        quotas = sizes * n / len(samples)
+        counts = np.floor(quotas).astype(int)
+        remainders = np.argsort(counts - quotas, kind="stable")
+        counts[remainders[: n - counts.sum()]] += 1
+
+        # Shuffle once, then keep the first samples of each stratum
+        order = rng.permutation(len(samples))
+        order = order[np.argsort(strata[order], kind="stable")]
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        ranks = np.arange(len(samples)) - np.repeat(starts, sizes)
+        return samples[order[ranks < np.repeat(counts, sizes)]]
+
+    def get_joined_dataframe(
+        self, models: List[str], columns: List[str] = None
+    ) -> pd.DataFrame:
+        """
+        Return the project samples with the results of several models side by side.
+        The results columns are prefixed by the model name: "{model}_{result}",
+        the samples without results for a model have missing values.
+
+        params:
+            models : list : the names of the models
+            columns : list : the samples columns to keep, all by default,
+                the blocks names and the sample_id are always kept
+
+        The samples and the models results are downloaded concurrently.
+        """
+        block_structure = self.get_block_structure()
+
+        debiai_models = []
+        for model_name in models:
+            model = self.get_model(model_name)
+            if model is None:
+                raise ValueError("The model '" + model_name + "' does not exist")
+            debiai_models.append(model)
+
+        projection = None
+        if columns is not None:
+            projection = [block["name"] for block in block_structure]
+            projection += [c for c in columns if c not in projection]
+
+        # Download the samples and the models results concurrently
+        def get_samples():
+            return utils.get_project_samples_columns(
+                self.debiai_url, self.id, block_structure, projection
+            )
+
+        def get_results(model):
+            return lambda: model.get_results_dataframe()
+
+        tasks = [get_samples] + [get_results(model) for model in debiai_models]
+        samples_columns, *models_results = utils.parallel_map(
+            lambda task: task(), tasks
+        )
+        samples_df = utils.samples_columns_to_df(samples_columns, block_structure)
+
+        # Align the results with the samples: the sample_id hash index is created
+        # once per model, then each results column is taken by position
+        joined_columns = {}
+        for model, results_df in zip(debiai_models, models_results):
+            positions = pd.Index(results_df["sample_id"]).get_indexer(
+                samples_df["sample_id"]
+            )
+            for result_name in results_df.columns:
+                if result_name == "sample_id":
+                    continue
+                joined_columns[model.name + "_" + result_name] = pd.api.extensions.take(
+                    results_df[result_name].array, positions, allow_fill=True
+                )
+
+        results_df = pd.DataFrame(joined_columns, index=samples_df.index)
+        return pd.concat([samples_df, results_df], axis=1)
+
+    def iter_dataframes(self, columns: List[str] = None):
+        """
+        Yield the project samples, one dataframe per downloaded page,
+        with the "sample_id" column and the given columns (all by default).
+        """
+        block_structure = self.get_block_structure()
+
+        for page in utils.iter_project_samples_columns(
+            self.debiai_url, self.id, block_structure, columns
+        ):
+            yield pd.DataFrame(page)
+
+    def get_arrow_table(self):
+        """
+        Return the project samples as a pyarrow Table,
+        the samples are decoded into columns without creating a DataFrame
+        """
+        import_pyarrow()
+        block_structure = self.get_block_structure()
+
+        columns = utils.get_project_samples_columns(
+            self.debiai_url, self.id, block_structure
+        )
+
+        return samples_columns_to_arrow(columns, block_structure)
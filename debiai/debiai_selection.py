@@ -1,6 +1,10 @@
-import pandas as pd
+from __future__ import annotations
 
-import utils as utils
+from . import utils
+from .debiai_services.arrow import import_pyarrow, samples_columns_to_arrow
+from .debiai_services.lazy_import import LazyModule
+
+pd = LazyModule("pandas")
 
 DEBIAI_TYPES = ["contexts", "inputs", "groundTruth", "others"]
 
@@ -42,6 +46,17 @@ class Debiai_selection:
 
         return samples
 
+    def get_arrow_table(self):
+        """Return the selection samples as a pyarrow Table"""
+        import_pyarrow()
+        block_structure = self.project.get_block_structure()
+
+        columns = utils.get_selection_samples_columns(
+            self.project.debiai_url, self.project.id, self.id, block_structure
+        )
+
+        return samples_columns_to_arrow(columns, block_structure)
+
     def get_samples_id(self):
         return utils.get_samples_id_from_selection(
             self.project.debiai_url, self.project.id, self.id
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import List
+
+from .df_to_dict_tree import rows_to_results_dict
+
+
+def import_pyarrow():
+    """
+    Return the pyarrow module, imported on the first use
+    pyarrow is an optional dependency
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is required for this operation: pip install pyarrow")
+    return pyarrow
+
+
+def check_arrow_table(table, name: str = "samples"):
+    pa = import_pyarrow()
+    if not isinstance(table, pa.Table):
+        raise TypeError("The " + name + " must be a pyarrow Table")
+
+
+def table_rows(table, columns: List[str]):
+    """
+    Iterate over the rows of the given table columns
+    Only those columns are converted to Python values
+    """
+    return zip(*(table.column(name).to_pylist() for name in columns))
+
+
+def arrow_to_results_dict(table, block_structure: list, results_name: List[str]):
+    """Create the results dict of a model from a pyarrow Table"""
+    block_names = [block["name"] for block in block_structure]
+    for name in block_names + results_name:
+        if name not in table.column_names:
+            raise ValueError("'" + name + "' is missing from the given results")
+
+    rows = table_rows(table, block_names + results_name)
+    return rows_to_results_dict(rows, len(block_names))
+
+
+def samples_columns_to_arrow(columns: dict, block_structure: list):
+    """Create a pyarrow Table from downloaded samples columns"""
+    pa = import_pyarrow()
+    table = pa.table(columns)
+
+    if table.num_rows == 0:
+        return table
+
+    # Sort the table rows by the blocks names
+    return table.sort_by([(block["name"], "ascending") for block in block_structure])
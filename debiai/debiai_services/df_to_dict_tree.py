@@ -1,13 +1,34 @@
-import pandas as pd
+from __future__ import annotations
+
+import json
 import math
 
+from .lazy_import import LazyModule
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
 DEBIAI_TYPES = ["contexts", "inputs", "groundTruth", "others"]
 
 
-def df_to_dict_tree(df: pd.DataFrame, block_structure: list):
+def get_required_columns(block_structure: list) -> list:
+    """Return the names of the columns required to add samples to a project"""
+    columns = []
+    for block in block_structure:
+        columns.append(block["name"])
+        for type_ in DEBIAI_TYPES:
+            if type_ in block:
+                for col in block[type_]:
+                    columns.append(col["name"])
+    return columns
+
+
+def check_df_columns(column: list, block_structure: list) -> dict:
+    """
+    Check that the block structure columns are in the given columns
+    return the position of the block structure columns
+    """
     col_index_map = {}
-    data = df.to_dict("split")
-    column = data["columns"]
 
     # find the position of the columns of the block structure in the dataframe
     for block in block_structure:
@@ -32,9 +53,61 @@ def df_to_dict_tree(df: pd.DataFrame, block_structure: list):
 
                     col_index_map[col["name"]] = column.index(col["name"])
 
+    return col_index_map
+
+
+def df_to_dict_tree(df: pd.DataFrame, block_structure: list):
+    data = df.to_dict("split")
+    col_index_map = check_df_columns(data["columns"], block_structure)
+
+    return rows_to_dict_tree(data["data"], col_index_map, block_structure)
+
+
+def root_block_chunks(df: pd.DataFrame, block_structure: list, chunk_size: int):
+    """
+    Yield the dataframe rows by chunks of about chunk_size rows, grouped by root
+    block and cut at the root blocks boundaries, so that a root block is in a
+    single chunk unless it has more than chunk_size rows
+    """
+    codes = pd.factorize(df[block_structure[0]["name"]])[0]
+    if np.any(np.diff(codes) < 0):
+        order = np.argsort(codes, kind="stable")
+        df = df.iloc[order]
+        codes = codes[order]
+
+    # Position of the first row of each root block
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+
+    start = 0
+    while start < df.shape[0]:
+        end = start + chunk_size
+        if end < df.shape[0]:
+            # Last root block boundary in the chunk, if any
+            i = np.searchsorted(boundaries, end, side="right") - 1
+            if i >= 0 and boundaries[i] > start:
+                end = boundaries[i]
+        yield df.iloc[start:end]
+        start = end
+
+
+def df_to_json_tree(columns: dict, block_structure: list) -> bytes:
+    """
+    Create the block tree from the block structure columns of a dataframe,
+    serialized to JSON, run by the processes of add_samples_pd
+    """
+    df = pd.DataFrame(columns, copy=False)
+    return json.dumps(df_to_dict_tree(df, block_structure)).encode("utf-8")
+
+
+def rows_to_dict_tree(rows, col_index_map: dict, block_structure: list):
+    """
+    Create the block tree from rows of values,
+    col_index_map gives the position of each block structure column in a row
+    """
+
     # Create a tree json with only the blocks names
     block_tree_dict = {}
-    for sample in data["data"]:
+    for sample in rows:
         parent = block_tree_dict
         for level, block_level in enumerate(block_structure):
             block_name = sample[col_index_map[block_level["name"]]]
@@ -89,3 +162,36 @@ def __block_dict_to_array_tree(level, block_dict, block_structure):
 
     block_dict["childrenInfoList"] = children_info_list
     return block_dict
+
+
+def df_to_results_dict(df: pd.DataFrame, block_structure: list, results_name: list):
+    """Create the results dict of a model from a dataframe, see rows_to_results_dict"""
+    block_names = [block["name"] for block in block_structure]
+    for name in block_names + results_name:
+        if name not in df.columns:
+            raise ValueError("'" + name + "' is missing from the given results")
+
+    rows = zip(*(df[name].tolist() for name in block_names + results_name))
+    return rows_to_results_dict(rows, len(block_names))
+
+
+def rows_to_results_dict(rows, nb_levels: int) -> dict:
+    """
+    Create the results dict of a model from rows of values:
+    the blocks names, followed by the results
+
+    Rows form
+    b1    b2    sample    res1  res2  res3
+    b1-1  b2-1  sample-1  1     2     "a"
+
+    Dict form :
+    {"b1-1": {"b2-1": {"sample-1": [1, 2, "a"]}}}
+    """
+    results_dict = {}
+    for row in rows:
+        parent = results_dict
+        for block_name in row[: nb_levels - 1]:
+            parent = parent.setdefault(block_name, {})
+        parent[row[nb_levels - 1]] = list(row[nb_levels:])
+
+    return results_dict
@@ -0,0 +1,268 @@
+"""
+Incremental JSON parsing of the responses, the values are decoded as the bytes
+arrive, without holding the whole response text
+"""
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",:]}"
+
+# The content of a string: anything but a quote, the escapes included
+STRING_CONTENT = r'[^"\\]*(?:\\.[^"\\]*)*'
+# The text up to the next bracket, or the next string that isn't complete
+SKIP = re.compile(r'(?:[^"\[\]{}]+|"' + STRING_CONTENT + '")*', re.DOTALL)
+COMPLETE_STRING = re.compile('"' + STRING_CONTENT + '"', re.DOTALL)
+NOT_BRACKET = re.compile(r"[^\[\]{}]+")
+BRACKETS_PAIR = re.compile(r"[\[{][\]}]")
+STRING_END = re.compile(STRING_CONTENT, re.DOTALL)
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    """
+    A sliding text buffer over an iterable of bytes chunks,
+    the consumed text is dropped as the parsing goes
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+        # State of the scan of a string, an array or an object
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def read_more(self) -> bool:
+        """Add the next chunk to the buffer, return False at the end of the stream"""
+        if self.eof:
+            return False
+
+        # Drop the consumed text
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos :]  # noqa
+            self.pos = 0
+
+        for chunk in self.chunks:
+            text = self.text_decoder.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+
+        self.buffer += self.text_decoder.decode(b"", final=True)
+        self.eof = True
+        return True
+
+    def next_char(self) -> str:
+        """Skip the whitespaces, return the next character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                raise ValueError("Unexpected end of the JSON response")
+
+    def expect(self, chars: str) -> str:
+        """Consume the next character, it must be one of chars"""
+        char = self.next_char()
+        if char not in chars:
+            raise ValueError(
+                "Invalid JSON response: expected one of '"
+                + chars
+                + "' at "
+                + repr(self.buffer[self.pos : self.pos + 20])  # noqa
+            )
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode and consume the next JSON value"""
+        if self.next_char() in '{["':
+            # Decoded once complete: decoding again at each chunk is quadratic
+            self.__read_value()
+            value, self.pos = _decoder.raw_decode(self.buffer, self.pos)
+            return value
+
+        # A number or a literal, short
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number may continue in the next chunk, until a delimiter
+                if self.eof or (
+                    end < len(self.buffer) and self.buffer[end] in DELIMITERS
+                ):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+    def __read_value(self):
+        """Read the chunks until the string, array or object at pos is complete"""
+        opening = self.buffer[self.pos]
+        self.depth = 0 if opening == '"' else 1
+        self.in_string, self.escaped = opening == '"', False
+        if self.__scan(self.buffer, self.pos + 1) != -1:
+            return
+
+        # The new text is scanned once, and joined once
+        texts = [self.buffer[self.pos :]]  # noqa
+        if not self.eof:
+            for chunk in self.chunks:
+                texts.append(self.text_decoder.decode(chunk))
+                if self.__scan(texts[-1], 0, whole_text=True) != -1:
+                    break
+            else:
+                texts.append(self.text_decoder.decode(b"", final=True))
+                self.eof = True
+        self.buffer = "".join(texts)
+        self.pos = 0
+
+    def __scan(self, text: str, pos: int, whole_text: bool = False) -> int:
+        """
+        Follow the strings and brackets of text from pos, return the end of the
+        scanned value, or -1 if it continues in the next text
+        whole_text: first check if the value continues after the whole text,
+            for the new chunks of a large value
+        """
+        if self.in_string:
+            pos = self.__string_end(text, pos)
+            if pos == -1 or self.depth == 0:
+                return pos
+        if whole_text and self.__continues(text, pos):
+            return -1
+
+        while True:
+            pos = SKIP.match(text, pos).end()
+            if pos >= len(text):
+                return -1
+            char = text[pos]
+            pos += 1
+            if char == '"':
+                self.in_string = True
+                pos = self.__string_end(text, pos)
+                if pos == -1 or self.depth == 0:
+                    return pos
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+
+    def __string_end(self, text: str, pos: int) -> int:
+        """Return the end of the string being scanned, or -1 if it continues"""
+        if self.escaped:
+            if pos >= len(text):
+                return -1
+            pos += 1
+            self.escaped = False
+        pos = STRING_END.match(text, pos).end()
+        if pos >= len(text):
+            return -1
+        if text[pos] == "\\":
+            # The escaped character is in the next text
+            self.escaped = True
+            return -1
+        self.in_string = False
+        return pos + 1
+
+    def __continues(self, text: str, pos: int) -> bool:
+        """
+        Return True if the scanned value continues after text, and follow the
+        text: it can't end in a text with less unmatched closing brackets than
+        the depth. The pairs of brackets are removed with one regex pass by
+        nesting level, without a step per bracket
+        """
+        text = COMPLETE_STRING.sub("", text[pos:])
+        quote = text.find('"')
+        if quote != -1:
+            text, string_start = text[:quote], text[quote + 1 :]  # noqa
+        brackets = NOT_BRACKET.sub("", text)
+        while True:
+            unmatched = BRACKETS_PAIR.sub("", brackets)
+            if len(unmatched) == len(brackets):
+                break
+            brackets = unmatched
+
+        closing = unmatched.count("]") + unmatched.count("}")
+        if closing >= self.depth:
+            return False
+        self.depth += len(unmatched) - 2 * closing
+        if quote != -1:
+            # The text ends in a string
+            self.in_string = True
+            backslashes = len(string_start) - len(string_start.rstrip("\\"))
+            self.escaped = backslashes % 2 == 1
+        return True
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """Yield the items of a JSON array, one at a time"""
+    yield from _array_items(JsonStream(chunks))
+
+
+def iter_json_object_items(chunks: Iterable[bytes], key: str = None) -> Iterator:
+    """
+    Yield the (key, value) pairs of a JSON object, one at a time
+    key: yield the pairs of the object at this key of the root object instead,
+        the other values of the root object are skipped
+    """
+    stream = JsonStream(chunks)
+    if key is not None:
+        stream.expect("{")
+        while True:
+            if stream.value() == key:
+                stream.expect(":")
+                break
+            stream.expect(":")
+            stream.value()
+            stream.expect(",")
+
+    yield from _object_items(stream)
+
+
+def load_json(chunks: Iterable[bytes]):
+    """
+    Decode a JSON value, the items of a root array or object are decoded one at
+    a time: the whole text is never held in memory, only the decoded value
+    """
+    stream = JsonStream(chunks)
+    char = stream.next_char()
+    if char == "[":
+        return list(_array_items(stream))
+    if char == "{":
+        return dict(_object_items(stream))
+    return stream.value()
+
+
+def _array_items(stream: JsonStream) -> Iterator:
+    stream.expect("[")
+    if stream.next_char() == "]":
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(",]") == "]":
+            return
+
+
+def _object_items(stream: JsonStream) -> Iterator:
+    stream.expect("{")
+    if stream.next_char() == "}":
+        return
+    while True:
+        item_key = stream.value()
+        stream.expect(":")
+        yield item_key, stream.value()
+        if stream.expect(",}") == "}":
+            return
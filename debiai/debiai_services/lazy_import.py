@@ -0,0 +1,35 @@
+"""
+Lazy imports of the heavy dependencies (pandas, numpy, requests): a module is
+imported on the first access to one of its attributes, not when the debiai
+modules are imported
+"""
+
+import importlib
+
+
+class LazyModule:
+    """
+    A module imported on the first access to one of its attributes
+
+    copy_attributes: once imported, copy the module attributes to the object,
+        their next accesses are then as fast as the module ones, but a module
+        attribute replaced later (mock.patch, monkeypatch) isn't seen
+    """
+
+    def __init__(self, name: str, copy_attributes: bool = True):
+        self._lazy_name = name
+        self._lazy_copy_attributes = copy_attributes
+        self._lazy_module = None
+
+    def __getattr__(self, attribute: str):
+        # Only called for the attributes that aren't set on the object
+        module = self._lazy_module
+        if module is None:
+            module = importlib.import_module(self._lazy_name)
+            if self._lazy_copy_attributes:
+                self.__dict__.update(module.__dict__)
+            self._lazy_module = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "<lazy module '" + self._lazy_name + "'>"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import zipfile
+
+from .lazy_import import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+def np_samples_chunks(samples: np.ndarray, indexMap: dict, chunk_size: int, start=0):
+    """
+    Yield the samples of a numpy array as dataframes of chunk_size rows,
+    with the indexMap columns only: a 2D array with the columns index, or a
+    structured array with the fields names.
+    Only a chunk of the array is read at a time, a memory mapped array
+    (np.memmap, np.load(mmap_mode="r")) is never loaded entirely.
+
+    start: the first row of the samples, 1 to skip a labels row
+    """
+    for chunk_start in range(start, samples.shape[0], chunk_size):
+        rows = samples[chunk_start : chunk_start + chunk_size]  # noqa
+        yield np_rows_to_df(rows, indexMap)
+
+
+def np_rows_to_df(rows: np.ndarray, indexMap: dict) -> pd.DataFrame:
+    if rows.dtype.names is not None:
+        return pd.DataFrame({name: rows[name] for name in indexMap})
+    return pd.DataFrame({name: rows[:, i] for name, i in indexMap.items()})
+
+
+def npz_array_header(path: str, key: str):
+    """
+    Return the shape, the Fortran order flag and the dtype of an array of a
+    npz file, without reading its values
+    """
+    with zipfile.ZipFile(path) as zip_file:
+        with zip_file.open(key + ".npy") as f:
+            return __read_npy_header(f)
+
+
+def iter_npz_rows(path: str, key: str, chunk_size: int):
+    """
+    Yield the rows of an array of a npz file by chunks of chunk_size rows,
+    the array is read from the zip file, compressed or not, one chunk at a time.
+    The array must be in C order, without Python objects.
+    """
+    with zipfile.ZipFile(path) as zip_file:
+        with zip_file.open(key + ".npy") as f:
+            shape, fortran_order, dtype = __read_npy_header(f)
+            if fortran_order or dtype.hasobject:
+                raise ValueError("The '" + key + "' array can't be read by chunks")
+
+            row_shape = shape[1:]
+            row_bytes = dtype.itemsize * int(np.prod(row_shape, dtype=np.int64))
+            for _ in range(0, shape[0], chunk_size):
+                buffer = f.read(chunk_size * row_bytes)
+                yield np.frombuffer(buffer, dtype=dtype).reshape((-1,) + row_shape)
+
+
+def __read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from .lazy_import import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+def check_samples_id(samples_id) -> np.ndarray:
+    """
+    Check that samples_id is a list, numpy array or Series of strings,
+    return it as a numpy array of fixed size strings: bytes strings when the ids
+    are ASCII (DebiAI hashes are), unicode strings otherwise
+    """
+    if samples_id is None:
+        raise ValueError("The samples ID list is required")
+    if not isinstance(samples_id, (list, np.ndarray, pd.Series)):
+        raise TypeError("The samples ID list must be a list")
+    if len(samples_id) == 0:
+        raise ValueError("The samples ID list is required")
+
+    if isinstance(samples_id, pd.Series):
+        samples_id = samples_id.to_numpy()
+
+    # Vectorized type check, numpy strings arrays are already valid
+    if not isinstance(samples_id, np.ndarray) or samples_id.dtype.kind not in "SU":
+        if pd.api.types.infer_dtype(samples_id, skipna=False) != "string":
+            raise ValueError("The samples ID list must be a list of strings")
+
+    try:
+        return np.asarray(samples_id, dtype=np.bytes_)
+    except UnicodeEncodeError:
+        return np.asarray(samples_id, dtype=np.str_)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from .lazy_import import LazyModule
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
+ADD_SAMPLES_MODES = ["skip_existing"]
+
+
+def hash_samples_keys(df: pd.DataFrame, block_structure: list) -> np.ndarray:
+    """
+    Hash the block path (the block names, from the root block to the sample)
+    of each row of the dataframe
+    """
+    block_names = [block["name"] for block in block_structure]
+    keys = df[block_names].astype(str)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def create_samples_index(df: pd.DataFrame, block_structure: list) -> pd.Index:
+    """
+    Create the samples index of a dataframe: the hashes of its samples block paths
+    """
+    if df.empty:
+        return pd.Index([], dtype=np.uint64)
+
+    return pd.Index(hash_samples_keys(df, block_structure)).unique()
+
+
+def filter_known_samples(
+    df: pd.DataFrame, block_structure: list, samples_index: pd.Index, mode: str
+):
+    """
+    Remove from the dataframe the samples that don't need to be uploaded
+
+    mode:
+        "skip_existing" : keep only the samples that are not in the index
+
+    Duplicated samples in the dataframe are dropped, only the first one is kept,
+    as the first one is the one that would have been added to the block tree.
+
+    return the filtered dataframe and its samples index
+    """
+    if mode not in ADD_SAMPLES_MODES:
+        raise ValueError(
+            "Unknown mode '" + str(mode) + "', use one of : " + str(ADD_SAMPLES_MODES)
+        )
+
+    keys = pd.Index(hash_samples_keys(df, block_structure))
+    to_add = ~keys.duplicated(keep="first") & ~keys.isin(samples_index)
+
+    return df[to_add], keys[to_add]
+
+
+def update_samples_index(samples_index: pd.Index, new_index: pd.Index) -> pd.Index:
+    """Add the new_index entries, not in the samples index yet, to it"""
+    if new_index.empty:
+        return samples_index
+    return samples_index.append(new_index)
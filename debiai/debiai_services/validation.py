@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from typing import List
+
+from .lazy_import import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+DEBIAI_TYPES = ["contexts", "inputs", "groundTruth", "others"]
+
+BOOLEAN_VALUES = {
+    True: True,
+    False: False,
+    1: True,
+    0: False,
+    "true": True,
+    "false": False,
+    "1": True,
+    "0": False,
+}
+# Missing values of the number and boolean columns, numpy arrays of mixed
+# values convert them to strings
+MISSING_STRINGS = ["", "nan", "NaN", "None"]
+MAX_REPORTED_RANGES = 5
+
+
+def validate_samples_df(
+    df: pd.DataFrame, block_structure: list, first_row: int = 0
+) -> pd.DataFrame:
+    """
+    Check the values of the block structure columns against their declared type,
+    column by column, and return the dataframe with the coerced columns:
+
+        number : numbers or numeric strings, converted to numbers
+        text : strings, numbers and booleans are converted to strings
+        boolean : booleans, 0 / 1 and "true" / "false" strings
+        list : lists, tuples and numpy arrays, converted to lists
+        dict : dicts
+
+    Missing values are allowed in every type.
+    Every invalid column is reported in a single ValueError, with the position
+    of its invalid rows. The given dataframe isn't modified.
+
+    first_row: the position of the first row of the dataframe in all the samples,
+        the reported rows of a chunk are counted from the first sample
+    """
+    coerced = {}
+    errors = []
+    for block in block_structure:
+        for type_ in DEBIAI_TYPES:
+            for column in block.get(type_, []):
+                values = df[column["name"]]
+                new_values, invalid = coerce_column(values, column["type"])
+                if invalid is not None and invalid.any():
+                    errors.append(
+                        __invalid_column_message(column, values, invalid, first_row)
+                    )
+                elif new_values is not values:
+                    coerced[column["name"]] = new_values
+
+    if errors:
+        raise ValueError("Invalid samples values:\n" + "\n".join(errors))
+    if not coerced:
+        return df
+
+    df = df.copy(deep=False)
+    for name, values in coerced.items():
+        df[name] = values
+    return df
+
+
+def coerce_column(values: pd.Series, type_: str):
+    """
+    Coerce a column to a DebiAI type
+    return the coerced column, the values itself if it is already valid, and the
+    boolean mask of the invalid values, None if there are none
+
+    The column dtype is checked once: the values of a column of numbers or
+    strings aren't checked one by one. The types of the values of the other
+    columns are found in one pass, then each distinct type is checked once.
+    """
+    if type_ == "number":
+        if pd.api.types.is_bool_dtype(values):
+            return values.astype(float), None
+        if pd.api.types.is_numeric_dtype(values):
+            return values, None
+        numbers = pd.to_numeric(values, errors="coerce")
+        return numbers, numbers.isna().to_numpy() & ~__is_missing(values)
+
+    if type_ == "text":
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred in ("string", "empty"):
+            return values, None
+        missing = values.isna().to_numpy()
+        invalid = None
+        if inferred not in SCALAR_INFERRED_TYPES:
+            is_scalar = __isinstance_mask(values, (str, int, float, bool, np.generic))
+            invalid = ~is_scalar & ~missing
+        texts = values.astype(str).astype(object).where(~missing, None)
+        return texts, invalid
+
+    if type_ == "boolean":
+        if pd.api.types.is_bool_dtype(values):
+            return values, None
+        missing = __is_missing(values)
+        if pd.api.types.infer_dtype(values, skipna=True) == "boolean":
+            return values.astype(object).where(~missing, None), None
+        booleans = __boolean_values(values)
+        invalid = booleans.isna().to_numpy() & ~missing
+        return booleans.where(~missing, None), invalid
+
+    if type_ == "list":
+        missing = values.isna().to_numpy()
+        is_list = __isinstance_mask(values, list)
+        to_convert = __isinstance_mask(values, (tuple, np.ndarray))
+        lists = values
+        if to_convert.any():
+            lists = values.copy()
+            lists[to_convert] = values[to_convert].map(list)
+        return lists, ~(is_list | to_convert) & ~missing
+
+    if type_ == "dict":
+        missing = values.isna().to_numpy()
+        return values, ~__isinstance_mask(values, dict) & ~missing
+
+    return values, None
+
+
+# infer_dtype results of the columns that only contain scalar values
+SCALAR_INFERRED_TYPES = [
+    "integer",
+    "floating",
+    "mixed-integer-float",
+    "decimal",
+    "boolean",
+]
+
+# infer_dtype results of the columns that may contain strings
+STRING_INFERRED_TYPES = ["string", "mixed", "mixed-integer"]
+
+
+def __isinstance_mask(values: pd.Series, classes) -> np.ndarray:
+    """isinstance of each value, each distinct type of the values is checked once"""
+    types = values.map(type)
+    valid_types = [t for t in types.unique() if issubclass(t, classes)]
+    return types.isin(valid_types).to_numpy()
+
+
+def __boolean_values(values: pd.Series) -> pd.Series:
+    """Map the values to booleans with BOOLEAN_VALUES, None for the others"""
+    keys = values.astype(object)
+    if pd.api.types.infer_dtype(values, skipna=True) in STRING_INFERRED_TYPES:
+        lowered = keys.str.lower()
+        keys = lowered.where(lowered.notna(), keys)
+    try:
+        booleans = keys.map(BOOLEAN_VALUES)
+    except TypeError:
+        # Unhashable values, the hashable ones are mapped
+        hashable = ~__isinstance_mask(keys, (list, dict, set, np.ndarray))
+        booleans = pd.Series(None, index=keys.index, dtype=object)
+        booleans[hashable] = keys[hashable].map(BOOLEAN_VALUES)
+    return booleans.astype(object).where(booleans.notna(), None)
+
+
+def __is_missing(values: pd.Series) -> np.ndarray:
+    return values.isna().to_numpy() | values.isin(MISSING_STRINGS).to_numpy()
+
+
+def row_ranges(positions: np.ndarray) -> List[str]:
+    """Group sorted row positions into ranges: [1, 2, 3, 7] -> ["1-3", "7"]"""
+    if len(positions) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    starts = np.concatenate([[positions[0]], positions[breaks]])
+    ends = np.concatenate([positions[breaks - 1], [positions[-1]]])
+    return [
+        str(start) if start == end else str(start) + "-" + str(end)
+        for start, end in zip(starts, ends)
+    ]
+
+
+def __invalid_column_message(
+    column: dict, values: pd.Series, invalid, first_row: int
+) -> str:
+    positions = np.flatnonzero(invalid)
+    ranges = row_ranges(positions + first_row)
+    if len(ranges) > MAX_REPORTED_RANGES:
+        ranges = ranges[:MAX_REPORTED_RANGES] + ["..."]
+
+    return (
+        "'"
+        + column["name"]
+        + "' "
+        + column["type"]
+        + " column: "
+        + str(len(positions))
+        + " invalid values at rows "
+        + ", ".join(ranges)
+        + " (first one: "
+        + repr(values.iloc[positions[0]])
+        + ")"
+    )
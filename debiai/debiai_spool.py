@@ -0,0 +1,300 @@
+import json
+import os
+import threading
+
+from . import utils
+from .debiai_services.lazy_import import LazyModule
+
+requests = LazyModule("requests", copy_attributes=False)
+
+ACK_FILE = "acked"
+DEAD_LETTER_FILE = "refused.jsonl"
+COMPACT_THRESHOLD = 1000  # Number of acknowledged entries that triggers a compaction
+DEFAULT_DRAIN_INTERVAL = 1.0
+
+
+class Debiai_spool:
+    """
+    A durable write-ahead spool of the samples and results uploads
+
+    Each chunk is appended to a journal file in the spool directory and synced
+    to the disk, then the producer continues: the chunks are sent by a background
+    thread, in the journal order. The number of acknowledged chunks is saved in a
+    separate file and the acknowledged chunks are compacted away from the journal.
+
+    When the backend can't be reached or fails with a 5xx response, the chunks
+    stay in the journal and the thread tries again every drain_interval seconds.
+    They are also replayed by flush(), or by a new spool opened on the same
+    directory after a crash.
+
+    A chunk refused by the backend (a 4xx response) is moved to the refused.jsonl
+    dead letter file of the spool directory, with the error, and the replay goes
+    on with the next chunks. See refused_chunks.
+    """
+
+    def __init__(self, spool_dir: str, drain_interval: float = DEFAULT_DRAIN_INTERVAL):
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+        self._ack_path = os.path.join(spool_dir, ACK_FILE)
+        self.dead_letter_path = os.path.join(spool_dir, DEAD_LETTER_FILE)
+
+        # The journal file is written by the producers and the compaction,
+        # the replay runs one at a time
+        self._journal_lock = threading.RLock()
+        self._drain_lock = threading.Lock()
+
+        # The ack file gives the current journal generation
+        # and its number of acknowledged entries
+        self._generation, self._nb_acked = self.__read_ack()
+        self._nb_entries = self.__open_journal()
+
+        # Set by the producers and close() to wake the background replay up
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self.__drain_loop, args=(drain_interval,), daemon=True
+        )
+        self._thread.start()
+
+    def __repr__(self):
+        return (
+            "DEBIAI spool : '" + str(self.spool_dir) + "'\n"
+            "pending chunks : " + str(self.nb_pending()) + "\n"
+            "refused chunks : " + str(len(self.refused_chunks())) + "\n"
+        )
+
+    # Producers
+    def add_tree(self, debiai_url: str, project_id: str, tree: list):
+        """Spool a samples tree, see utils.post_add_tree"""
+        self.__append(
+            {
+                "kind": "samples",
+                "debiai_url": debiai_url,
+                "project_id": project_id,
+                "tree": tree,
+            }
+        )
+
+    def add_tree_json(self, debiai_url: str, project_id: str, tree_json: bytes):
+        """Spool a samples tree already serialized to JSON"""
+        entry = json.dumps(
+            {"kind": "samples", "debiai_url": debiai_url, "project_id": project_id}
+        )
+        # The tree is inserted as the last entry value, without parsing it
+        self.__append_line(entry[:-1] + ', "tree": ' + tree_json.decode("utf-8") + "}")
+
+    def add_results_dict(
+        self,
+        debiai_url: str,
+        project_id: str,
+        model_id: str,
+        results: dict,
+        expected_results_order: list,
+    ):
+        """Spool a model results dict, see utils.post_model_results_dict"""
+        self.__append(
+            {
+                "kind": "results",
+                "debiai_url": debiai_url,
+                "project_id": project_id,
+                "model_id": model_id,
+                "results": results,
+                "expected_results_order": expected_results_order,
+            }
+        )
+
+    def __append(self, entry: dict):
+        self.__append_line(json.dumps(entry))
+
+    def __append_line(self, entry_json: str):
+        line = entry_json + "\n"
+        with self._journal_lock:
+            journal_path = self.__journal_path(self._generation)
+            with open(journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._nb_entries += 1
+
+        # The producer never sends, the background thread does
+        self._wake.set()
+
+    # Replay
+    def flush(self) -> int:
+        """
+        Send the pending chunks, in order, until the backend can't be reached
+        return the number of chunks still pending
+        """
+        return self.drain()
+
+    def drain(self) -> int:
+        with self._drain_lock:
+            try:
+                for entry in self.__pending_entries():
+                    try:
+                        self.__send(entry)
+                    except utils.ServerError:
+                        raise
+                    except ValueError as e:
+                        # Refused by the backend, sending it again won't help
+                        self.__dead_letter(entry, e)
+                    self.__ack()
+            except (requests.exceptions.RequestException, utils.ServerError):
+                # The backend is down or restarting, the chunks will be replayed later
+                pass
+            finally:
+                self.__compact()
+            return self.nb_pending()
+
+    def nb_pending(self) -> int:
+        """Return the number of chunks not acknowledged by the backend"""
+        with self._journal_lock:
+            return self._nb_entries - self._nb_acked
+
+    def refused_chunks(self) -> list:
+        """
+        Return the chunks refused by the backend, oldest first,
+        as {"error": str, "entry": the spooled chunk} dicts
+        """
+        if not os.path.exists(self.dead_letter_path):
+            return []
+        with open(self.dead_letter_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.endswith("\n")]
+
+    def close(self):
+        """Stop the background replay, the pending chunks stay in the journal"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def __drain_loop(self, drain_interval: float):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                nb_pending = self.drain()
+            except Exception:
+                # Journal error, the replay goes on
+                utils.logger.exception("Spool replay failed, retrying later")
+                nb_pending = self.nb_pending()
+
+            # Wait for the next upload, or retry the pending chunks later
+            self._wake.wait(drain_interval if nb_pending else None)
+
+    @staticmethod
+    def __send(entry: dict):
+        if entry["kind"] == "samples":
+            utils.post_add_tree(entry["debiai_url"], entry["project_id"], entry["tree"])
+        else:
+            utils.post_model_results_dict(
+                entry["debiai_url"],
+                entry["project_id"],
+                entry["model_id"],
+                entry["results"],
+                entry["expected_results_order"],
+            )
+
+    def __dead_letter(self, entry: dict, error: Exception):
+        """Append a refused entry to the dead letter file, before acknowledging it"""
+        utils.logger.error(
+            "Spool chunk refused by the backend, moved to "
+            + self.dead_letter_path
+            + " : "
+            + str(error)
+        )
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"error": str(error), "entry": entry}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Journal files
+    def __journal_path(self, generation: int) -> str:
+        return os.path.join(self.spool_dir, "journal." + str(generation) + ".jsonl")
+
+    def __open_journal(self) -> int:
+        """
+        Create or repair the current journal, remove the old generations
+        return the number of entries of the journal
+        """
+        journal_path = self.__journal_path(self._generation)
+        for file_name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, file_name)
+            if file_name.startswith("journal.") and path != journal_path:
+                os.remove(path)
+
+        nb_entries = 0
+        valid_size = 0
+        if os.path.exists(journal_path):
+            with open(journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    nb_entries += 1
+                    valid_size += len(line)
+
+        # Remove an entry partially written before a crash
+        with open(journal_path, "ab") as f:
+            f.truncate(valid_size)
+
+        return nb_entries
+
+    def __pending_entries(self):
+        """Yield the pending entries, the journal is read one line at a time"""
+        with self._journal_lock:
+            journal_path = self.__journal_path(self._generation)
+            nb_entries = self._nb_entries
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if i >= nb_entries:
+                    # Appended after the replay start
+                    break
+                if i >= self._nb_acked:
+                    yield json.loads(line)
+
+    def __read_ack(self):
+        if not os.path.exists(self._ack_path):
+            return 0, 0
+        with open(self._ack_path, "r", encoding="utf-8") as f:
+            generation, nb_acked = f.read().split()
+        return int(generation), int(nb_acked)
+
+    def __ack(self):
+        with self._journal_lock:
+            self._nb_acked += 1
+            self.__write_ack()
+
+    def __write_ack(self):
+        tmp_path = self._ack_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(self._generation) + " " + str(self._nb_acked))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._ack_path)
+
+    def __compact(self):
+        """Remove the acknowledged entries from the journal"""
+        with self._journal_lock:
+            if self._nb_acked == 0:
+                return
+            if self._nb_acked < self._nb_entries and self._nb_acked < COMPACT_THRESHOLD:
+                return
+
+            # Copy the pending entries to the next generation journal,
+            # the ack file switches to it atomically
+            old_path = self.__journal_path(self._generation)
+            new_path = self.__journal_path(self._generation + 1)
+            with open(old_path, "r", encoding="utf-8") as src, open(
+                new_path, "w", encoding="utf-8"
+            ) as dst:
+                for i, line in enumerate(src):
+                    if i >= self._nb_entries:
+                        break
+                    if i >= self._nb_acked:
+                        dst.write(line)
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            self._generation += 1
+            self._nb_entries -= self._nb_acked
+            self._nb_acked = 0
+            self.__write_ack()
+            os.remove(old_path)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Union
+
+from .config import get_config
+from .debiai_model import Debiai_model
+from .debiai_services.df_to_dict_tree import (
+    check_df_columns,
+    df_to_dict_tree,
+    df_to_results_dict,
+)
+from .debiai_services.lazy_import import LazyModule
+from .debiai_services.validation import validate_samples_df
+
+pd = LazyModule("pandas")
+
+SAMPLES = None  # Buffer key of the samples, the results are keyed by model ID
+
+
+class Debiai_uploader:
+    """
+    A background uploader of project samples and models results
+
+    The submitted dataframes are buffered, coalesced into chunks of chunk_size
+    rows, then uploaded by a pool of threads. Each submission returns a Future,
+    done once all its rows are uploaded. Rows that don't fill a chunk wait at
+    most linger seconds for more rows, then are uploaded, flush() uploads them
+    right away.
+
+    The dataframes waiting to be uploaded are kept in memory: a submission
+    blocks while they take more than max_queue_bytes.
+
+    max_queue_bytes, max_workers, chunk_size and linger default to the configured
+    max_queue_bytes, max_parallel_requests, upload_chunk_size and upload_linger.
+
+    The results of a model are uploaded after the samples submitted before them.
+    """
+
+    def __init__(
+        self,
+        project,
+        max_queue_bytes: int = None,
+        max_workers: int = None,
+        chunk_size: int = None,
+        linger: float = None,
+    ):
+        config = get_config()
+        if max_queue_bytes is None:
+            max_queue_bytes = config.max_queue_bytes
+        if max_workers is None:
+            max_workers = config.max_parallel_requests
+        if chunk_size is None:
+            chunk_size = config.upload_chunk_size
+        if linger is None:
+            linger = config.upload_linger
+
+        if max_queue_bytes <= 0:
+            raise ValueError("max_queue_bytes must be positive")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if linger < 0:
+            raise ValueError("linger must be positive or 0")
+
+        self.project = project
+        self.max_queue_bytes = max_queue_bytes
+        self.chunk_size = chunk_size
+        self.linger = linger
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self._condition = threading.Condition()
+        self._closed = False
+        # Bytes of the dataframes submitted and not uploaded yet
+        self._queued_bytes = 0
+        # Dataframes waiting to be coalesced, by target: SAMPLES or a model ID
+        # {target: [(df, Future, bytes)]}
+        self._buffers = {}
+        self._buffered_rows = {}
+        # Timers dispatching the buffers that don't fill a chunk, by target
+        self._linger_timers = {}
+        self._models = {}
+        # Samples uploads not finished yet
+        self._samples_tasks = set()
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_samples(self, df: pd.DataFrame) -> Future:
+        """
+        Submit samples to add to the project, see Debiai_project.add_samples_pd
+        return a Future, its result is True once the samples are uploaded: at
+        most linger seconds after the submission, plus the upload time
+        """
+        block_structure = self.project.get_block_structure()
+
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("The samples must be a pandas DataFrame")
+        check_df_columns(list(df.columns), block_structure)
+        df = validate_samples_df(df, block_structure)
+
+        # The project samples index and cache don't track background uploads
+        self.project._forget_samples()
+
+        return self.__submit(SAMPLES, df)
+
+    def add_results(self, model: Union[Debiai_model, str], df: pd.DataFrame) -> Future:
+        """
+        Submit results to add to a model, see Debiai_model.add_results_df
+        return a Future, its result is True once the results are uploaded: at
+        most linger seconds after the submission, plus the upload time
+        """
+        if isinstance(model, str):
+            model_name = model
+            model = self.project.get_model(model_name)
+            if model is None:
+                raise ValueError("The model '" + model_name + "' does not exist")
+
+        snapshot = self.project.snapshot
+        model.expected_results_exists(snapshot)
+
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("The results must be a pandas DataFrame")
+        results_name = [result["name"] for result in snapshot.expected_results]
+        for block in snapshot.block_structure:
+            if block["name"] not in df.columns:
+                raise ValueError("'" + block["name"] + "' is missing from the results")
+        for name in results_name:
+            if name not in df.columns:
+                raise ValueError("'" + name + "' is missing from the results")
+
+        with self._condition:
+            self._models[model.id] = model
+        return self.__submit(model.id, df)
+
+    def flush(self):
+        """
+        Upload all the submitted dataframes and wait for the uploads,
+        raise the first upload error
+        """
+        with self._condition:
+            self.__dispatch_all()
+            futures = self._futures
+            self._futures = []
+
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+
+    def close(self):
+        """Upload all the submitted dataframes, then stop the upload threads"""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+
+    # Submissions
+    def __submit(self, target, df: pd.DataFrame) -> Future:
+        future = Future()
+        if df.empty:
+            future.set_result(True)
+            return future
+
+        nb_bytes = int(df.memory_usage(index=True, deep=True).sum())
+
+        with self._condition:
+            if self._closed:
+                raise ValueError("The uploader is closed")
+
+            # Back-pressure: wait for the uploads to free some memory,
+            # a dataframe bigger than max_queue_bytes waits for an empty queue
+            while (
+                self._queued_bytes > 0
+                and self._queued_bytes + nb_bytes > self.max_queue_bytes
+            ):
+                self.__dispatch_all()
+                self._condition.wait()
+
+            self._queued_bytes += nb_bytes
+            self._futures.append(future)
+            self._buffers.setdefault(target, []).append((df, future, nb_bytes))
+            self._buffered_rows[target] = (
+                self._buffered_rows.get(target, 0) + df.shape[0]
+            )
+
+            if self._buffered_rows[target] >= self.chunk_size or self.linger == 0:
+                self.__dispatch(target)
+            elif target not in self._linger_timers:
+                timer = threading.Timer(
+                    self.linger, lambda: self.__linger_expired(target, timer)
+                )
+                timer.daemon = True
+                self._linger_timers[target] = timer
+                timer.start()
+
+        return future
+
+    def __linger_expired(self, target, timer: threading.Timer):
+        with self._condition:
+            # Not dispatched since the timer start
+            if self._linger_timers.get(target) is timer:
+                self.__dispatch(target)
+
+    def __dispatch_all(self):
+        # The samples first, the results may need them
+        if SAMPLES in self._buffers:
+            self.__dispatch(SAMPLES)
+        for target in list(self._buffers):
+            self.__dispatch(target)
+
+    def __dispatch(self, target):
+        """Coalesce the buffered dataframes of a target and start their upload"""
+        timer = self._linger_timers.pop(target, None)
+        if timer is not None:
+            timer.cancel()
+        if target != SAMPLES and SAMPLES in self._buffers:
+            # The results are uploaded after the samples submitted before them
+            self.__dispatch(SAMPLES)
+
+        submissions = self._buffers.pop(target)
+        del self._buffered_rows[target]
+
+        dfs = [df for df, _, _ in submissions]
+        df = dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+
+        if target == SAMPLES:
+            upload, after = self.__upload_samples, []
+        else:
+            upload = self.__upload_results(self._models[target])
+            after = list(self._samples_tasks)
+
+        tasks = []
+        for start in range(0, df.shape[0], self.chunk_size):
+            chunk = df.iloc[start : start + self.chunk_size]  # noqa
+            task = self._executor.submit(self.__run, upload, chunk, after)
+            tasks.append(task)
+            if target == SAMPLES:
+                self._samples_tasks.add(task)
+
+        nb_bytes = sum(b for _, _, b in submissions)
+        futures = [future for _, future, _ in submissions]
+        remaining = [len(tasks)]
+        errors = []
+
+        def task_done(task):
+            with self._condition:
+                self._samples_tasks.discard(task)
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+                self._queued_bytes -= nb_bytes
+                self._condition.notify_all()
+
+            for future in futures:
+                if errors:
+                    future.set_exception(errors[0])
+                else:
+                    future.set_result(True)
+
+        for task in tasks:
+            task.add_done_callback(task_done)
+
+    # Uploads, run by the threads
+    @staticmethod
+    def __run(upload, chunk: pd.DataFrame, after: List[Future]):
+        wait(after)
+        upload(chunk)
+
+    def __upload_samples(self, chunk: pd.DataFrame):
+        dict_to_add = df_to_dict_tree(chunk, self.project.block_structure)
+        self.project._post_add_tree(dict_to_add)
+
+    def __upload_results(self, model: Debiai_model):
+        results_name = self.__results_name()
+
+        def upload(chunk: pd.DataFrame):
+            results = df_to_results_dict(
+                chunk, self.project.block_structure, results_name
+            )
+            self.project._post_model_results_dict(model.id, results, results_name)
+
+        return upload
+
+    def __results_name(self) -> List[str]:
+        return [result["name"] for result in self.project.expected_results]
@@ -1,27 +1,60 @@
 # -*- coding: utf-8 -*-
 """
-    Utils : request manager
+Utils : request manager
 """
+
 # IMPORT
+from __future__ import annotations
+
 import sys
-import requests
 import logging
 import json
+import gzip
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 import time
 import math
-import pandas as pd
+
+from .config import get_config
+from .debiai_services.json_stream import (
+    iter_json_array,
+    iter_json_object_items,
+    load_json,
+)
+from .debiai_services.lazy_import import LazyModule
+
+# The requests are mocked by tests, their attributes aren't copied
+requests = LazyModule("requests", copy_attributes=False)
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
 
 # GLOBAL VARIABLES
-logging.basicConfig(filename="debiai.log", filemode="w", level=logging.INFO)
+# The application configures the logging, the module only creates its logger
+logger = logging.getLogger("debiai")
 
 PYTHON_DATA_PROVIDER_ID = "Python module Data Provider"
 
 CONNECTION_ERROR_MESSAGE = "Unable to connect to the DebiAI backend at the url : "
 
+# Responses of an overloaded or restarting backend, the request is sent again
+RETRY_STATUS_CODES = [502, 503, 504]
+
+# Methods that can be sent twice without changing the result, a POST is only
+# sent again when it never reached the backend
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+
+
+class ServerError(ValueError):
+    """The backend failed to handle an upload (5xx response), it can be sent again"""
+
 
 # Progress bar
 class progress_bar:
+    """
+    Progress bar printed on stdout
+    With a None size, only the current progression is printed, call end() when done
+    """
+
     BAR_SIZE = 40
 
     def __init__(self, name: str, size: int, para: str = ""):
@@ -33,6 +66,15 @@ class progress_bar:
         self.update(0)
 
     def update(self, current_progression: int):
+        if self.size is None:
+            # Unknown size : only display the progression
+            sys.stdout.write("\r")
+            sys.stdout.write(self.name + " : " + str(current_progression))
+            sys.stdout.write(" " + str(self.para))
+            sys.stdout.write(" " + str(math.floor(time.time() - self.start)) + "s")
+            sys.stdout.flush()
+            return
+
         if self.size == 0:
             sys.stdout.write(self.name + " : Progression bar size is 0")
             return
@@ -55,6 +97,98 @@ class progress_bar:
         if percent == 100:
             print("")
 
+    def end(self):
+        if self.size is None:
+            print("")
+
+
+# Parallel requests
+def parallel_map(
+    func, items, max_workers: int = None, return_exceptions: bool = False
+) -> list:
+    """
+    Call func on each item with a pool of threads, return the results in order
+    The first raised error is raised again once all the calls are done,
+    unless return_exceptions is set: the errors are then returned as results
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = get_config().max_parallel_requests
+
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(call, item) for item in items]
+    return [future.result() for future in futures]
+
+
+# Requests
+def send_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    requests.request with the configured timeout, retries and compression:
+    the JSON bodies are gzipped when the compression is enabled, and a GET, PUT or
+    DELETE request is sent again after a connection error, a timeout or a 502, 503,
+    504 response. A POST is only sent again when the connection couldn't be
+    opened: the backend may have applied a POST that timed out or failed
+    A body given as a generator is streamed, the request isn't retried
+    """
+    config = get_config()
+    kwargs.setdefault("timeout", config.timeout)
+
+    if config.compression:
+        headers = dict(kwargs.pop("headers", None) or {})
+        if "json" in kwargs:
+            kwargs["data"] = json.dumps(kwargs.pop("json")).encode()
+            headers["Content-Type"] = "application/json"
+        if isinstance(kwargs.get("data"), bytes):
+            kwargs["data"] = gzip.compress(kwargs["data"], compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+        kwargs["headers"] = headers
+
+    retries = config.retries
+    if kwargs.get("data") is not None and not isinstance(kwargs["data"], bytes):
+        retries = 0
+
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    for attempt in range(retries + 1):
+        try:
+            r = requests.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == retries or not (idempotent or __is_connect_error(e)):
+                raise
+        else:
+            if (
+                r.status_code not in RETRY_STATUS_CODES
+                or not idempotent
+                or attempt == retries
+            ):
+                return r
+            r.close()
+        logger.warning(method + " " + url + " failed, retry " + str(attempt + 1))
+        time.sleep(config.retry_backoff * 2**attempt)
+
+
+def __is_connect_error(error: Exception) -> bool:
+    """True if the request failed before being sent: connection refused or timed out"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+
+    from urllib3.exceptions import NewConnectionError
+
+    reason = getattr(error.args[0], "reason", error.args[0])
+    return isinstance(reason, NewConnectionError)
+
 
 # Dates
 def timestamp_to_date(timestamp):
@@ -66,35 +200,35 @@ def timestamp_to_date(timestamp):
 def check_back(debiai_url):
     """Check the connection with backend"""
     try:
-        ret = requests.get(debiai_url + "/version")
+        ret = send_request("GET", debiai_url + "/version")
 
         if "Online" not in ret.text:
             try:
-                ret2 = requests.get(debiai_url)
+                ret2 = send_request("GET", debiai_url)
                 if "Online" not in ret2.text:
                     raise ConnectionError(
                         "An application is running on the url : "
                         + debiai_url
                         + " but this is not DebiAI"
                     )
-                logging.info("DebiAI Server is up !\n")
+                logger.info("DebiAI Server is up !\n")
                 return True
             except (
                 requests.exceptions.ConnectionError,
                 requests.exceptions.Timeout,
                 requests.exceptions.RequestException,
             ):
-                logging.warning("Backend is down")
+                logger.warning("Backend is down")
                 raise ConnectionError(CONNECTION_ERROR_MESSAGE + debiai_url)
 
-        logging.info("DebiAI Server is up !\n")
+        logger.info("DebiAI Server is up !\n")
         return True
     except (
         requests.exceptions.ConnectionError,
         requests.exceptions.Timeout,
         requests.exceptions.RequestException,
     ):
-        logging.warning("Backend is down")
+        logger.warning("Backend is down")
         raise ConnectionError(
             "Unable to connect to the DebiAI backend at the url : " + debiai_url
         )
@@ -111,17 +245,17 @@ def project_url(debiai_url, project_id):
 # Projects
 def get_projects(debiai_url):
     """Return projects list as JSON"""
-    r = requests.request("GET", projects_url(debiai_url))
-    logging.info("Get_projects response: " + str(r.status_code))
-    logging.info(r.text)
+    r = send_request("GET", projects_url(debiai_url))
+    logger.info("Get_projects response: " + str(r.status_code))
+    logger.info(r.text)
     return json.loads(r.text)
 
 
 def get_project(debiai_url, id):
     """Return project (JSON) from id"""
-    r = requests.request("GET", project_url(debiai_url, id))
-    logging.info("Get_project response: " + str(r.status_code))
-    logging.info(r.text)
+    r = send_request("GET", project_url(debiai_url, id))
+    logger.info("Get_project response: " + str(r.status_code))
+    logger.info(r.text)
     if r.status_code == 404:
         return None
     return json.loads(r.text)
@@ -130,7 +264,7 @@ def get_project(debiai_url, id):
 def post_project(debiai_url, name):
     """Post new project and return project id"""
     data = {"projectName": name, "blockLevelInfo": [{"name": "file"}]}
-    r = requests.request("POST", url=debiai_url + "/projects", json=data)
+    r = send_request("POST", url=debiai_url + "/projects", json=data)
     if r.status_code != 200:
         raise ValueError(json.loads(r.text))
     info = json.loads(r.text)
@@ -140,11 +274,11 @@ def post_project(debiai_url, name):
 def delete_project(debiai_url, id):
     """Delete project from id"""
     try:
-        r = requests.request("DELETE", url=project_url(debiai_url, id))
+        r = send_request("DELETE", url=project_url(debiai_url, id))
         if r.status_code != 200:
             raise ValueError(json.loads(r.text))
 
-        logging.info("Deleted project: " + id)
+        logger.info("Deleted project: " + id)
         return True
     except requests.exceptions.RequestException:
         return False
@@ -153,7 +287,7 @@ def delete_project(debiai_url, id):
 # Block structure
 def post_expected_results(debiai_url, id, expected_results):
     """set the expected_results to a project"""
-    r = requests.request(
+    r = send_request(
         "POST",
         url=project_url(debiai_url, id) + "/resultsStructure",
         json=expected_results,
@@ -169,20 +303,20 @@ def add_blocklevel(debiai_url, id, blocklevel):
     Not used very much, should be removed
     TODO - Check if blocklevel already exists
     """
-    r = requests.request(
+    r = send_request(
         "POST",
         url=project_url(debiai_url, id) + "/blocklevels",
         json=blocklevel,
     )
-    logging.info("Add block response :" + str(r.status_code) + "-" + str(r.text))
+    logger.info("Add block response :" + str(r.status_code) + "-" + str(r.text))
     if r.status_code != 200:
         raise ValueError(json.loads(r.text))
-    logging.info("Added blocklevel to project " + id)
+    logger.info("Added blocklevel to project " + id)
 
 
 def post_add_expected_results(debiai_url, id, expected_result):
     """Add expected_result to a project"""
-    r = requests.request(
+    r = send_request(
         "POST",
         url=project_url(debiai_url, id) + "/expectedResult",
         json=expected_result,
@@ -196,7 +330,7 @@ def remove_expected_results(debiai_url, id, expected_result):
     """remove expected_result from a project"""
     obj = {"value": expected_result}
 
-    r = requests.request(
+    r = send_request(
         "POST",
         url=project_url(debiai_url, id) + "/del_expectedResult",
         json=obj,
@@ -209,46 +343,79 @@ def remove_expected_results(debiai_url, id, expected_result):
 # Selections
 def get_selections(debiai_url, id):
     """Return a project get_selections as JSON"""
-    r = requests.request("GET", project_url(debiai_url, id) + "/selections")
-    logging.info("get_requests response: " + str(r.status_code))
-    logging.info(r.text)
+    r = send_request("GET", project_url(debiai_url, id) + "/selections")
+    logger.info("get_requests response: " + str(r.status_code))
+    logger.info(r.text)
     return json.loads(r.text)
 
 
-def post_selection(debiai_url, id, name, samples_id) -> dict:
-    """Post new selection and return selection id"""
-    data = {"selectionName": name, "sampleHashList": samples_id}
-    r = requests.request(
-        "POST",
-        url=project_url(debiai_url, id) + "/selections",
-        json=data,
-    )
+def post_selection(debiai_url, id, name, samples_id: np.ndarray) -> dict:
+    """
+    Post new selection and return selection id
+    Large selections are streamed: the request body is generated chunk by chunk
+    """
+    url = project_url(debiai_url, id) + "/selections"
+
+    if len(samples_id) <= get_config().selection_chunk_size:
+        data = {
+            "selectionName": name,
+            "sampleHashList": samples_id.astype(str).tolist(),
+        }
+        r = send_request("POST", url=url, json=data)
+    else:
+        r = send_request(
+            "POST",
+            url=url,
+            data=__selection_body(name, samples_id),
+            headers={"Content-Type": "application/json"},
+        )
+
     if r.status_code != 200:
         raise ValueError(json.loads(r.text))
     info = json.loads(r.text)
     return info
 
 
+def __selection_body(name, samples_id: np.ndarray):
+    """Generate the JSON body of a selection, selection_chunk_size ids at a time"""
+    nb_samples = len(samples_id)
+    p_bar = progress_bar("Creating selection", nb_samples, name)
+
+    yield b'{"selectionName": ' + json.dumps(name).encode() + b', "sampleHashList": ['
+    chunk_size = get_config().selection_chunk_size
+    for i in range(0, nb_samples, chunk_size):
+        chunk = samples_id[i : i + chunk_size].astype(str).tolist()  # noqa
+        if i > 0:
+            yield b", "
+        yield json.dumps(chunk)[1:-1].encode()
+        p_bar.update(min([i + chunk_size, nb_samples]))
+    yield b"]}"
+
+
 def get_samples_id_from_selection(debiai_url, project_id, selection_id) -> List[str]:
     """Return a list of samples id from a selection"""
-    r = requests.request(
+    r = send_request(
         "GET",
         url=project_url(debiai_url, project_id) + "/selections/" + selection_id,
+        stream=True,
     )
-    logging.info("get_samples_id_from_selection response: " + str(r.status_code))
-    return json.loads(r.text)
+    logger.info("get_samples_id_from_selection response: " + str(r.status_code))
+    if r.status_code != 200:
+        raise ValueError(json.loads(r.text))
+    chunks = r.iter_content(get_config().stream_chunk_size)
+    return list(iter_json_array(chunks))
 
 
 def delete_selection(debiai_url, project_id, selection_id):
     """Delete a selection from a project"""
     try:
-        r = requests.request(
+        r = send_request(
             "DELETE",
             url=project_url(debiai_url, project_id) + "/selections/" + selection_id,
         )
         if r.status_code != 200:
             raise ValueError(json.loads(r.text))
-        logging.info("Deleted selection: " + selection_id)
+        logger.info("Deleted selection: " + selection_id)
         return True
     except requests.exceptions.RequestException:
         return False
@@ -259,7 +426,7 @@ def post_model(debiai_url, id, name, metadata):
     """Add to an existing project a tree of samples"""
     data = {"name": name, "metadata": metadata}
 
-    r = requests.request("POST", url=project_url(debiai_url, id) + "/models", json=data)
+    r = send_request("POST", url=project_url(debiai_url, id) + "/models", json=data)
 
     if r.status_code == 409:
         print("Warning : The model " + name + " already exists")
@@ -275,7 +442,7 @@ def post_model_results_dict(
     """Add to an existing project model some results from a tree dict"""
     data = {"results": results, "expected_results_order": expected_results_order}
     try:
-        r = requests.request(
+        r = send_request(
             "POST",
             url=project_url(debiai_url, project_id)
             + "/models/"
@@ -284,6 +451,10 @@ def post_model_results_dict(
             json=data,
         )
 
+        if r.status_code >= 500:
+            raise ServerError(
+                "post_model_results_dict : server error " + str(r.status_code)
+            )
         if r.status_code != 200:
             raise ValueError("post_model_results_dict : " + json.loads(r.text))
         return True
@@ -292,198 +463,423 @@ def post_model_results_dict(
         raise ValueError("The server returned an unexpected response")
 
 
+def get_model_evaluated_samples_id(debiai_url, project_id, model_id) -> List[str]:
+    """Return the list of the samples id that have results for a model"""
+    r = send_request(
+        "GET",
+        url=project_url(debiai_url, project_id)
+        + "/models/"
+        + model_id
+        + "/evaluated-data-id-list",
+    )
+    logger.info("get_model_evaluated_samples_id response: " + str(r.status_code))
+    if r.status_code != 200:
+        raise ValueError(json.loads(r.text))
+    return json.loads(r.text)
+
+
+def iter_model_results_columns(debiai_url, project_id, model_id, results_names):
+    """
+    Yield the model results page by page,
+    each page as a list of values for each result and the sample_id
+    max_parallel_requests pages are downloaded at the same time
+    """
+    samples_id = get_model_evaluated_samples_id(debiai_url, project_id, model_id)
+    page_size = get_config().samples_per_request
+    max_parallel_requests = get_config().max_parallel_requests
+
+    def get_page(i):
+        r = send_request(
+            "POST",
+            url=project_url(debiai_url, project_id)
+            + "/models/"
+            + model_id
+            + "/results",
+            json={"sampleIds": samples_id[i : i + page_size]},  # noqa
+            stream=True,
+        )
+        if r.status_code != 200:
+            raise ValueError(json.loads(r.text))
+
+        # Results returned are in a { "{sample_id}": [results] } format
+        page = create_samples_columns(results_names)
+        decode_samples_stream(r, results_names, page, key=None)
+        return page
+
+    pages_start = range(0, len(samples_id), page_size)
+    for i in range(0, len(pages_start), max_parallel_requests):
+        pages_group = pages_start[i : i + max_parallel_requests]  # noqa
+        for page in parallel_map(get_page, pages_group):
+            yield page
+
+
+def get_model_results_columns(debiai_url, project_id, model_id, results_names):
+    """Return the model results as a list of values for each result"""
+    columns = create_samples_columns(results_names)
+    for page in iter_model_results_columns(
+        debiai_url, project_id, model_id, results_names
+    ):
+        for column_name in columns:
+            columns[column_name].extend(page[column_name])
+    return columns
+
+
+def results_columns_to_df(columns: dict, expected_results) -> pd.DataFrame:
+    """
+    Create a dataframe from results columns, typed by the expected results:
+    number results are float64 and boolean results are nullable booleans
+    """
+    dataframe = pd.DataFrame(columns)
+
+    for result in expected_results:
+        if result["type"] == "number":
+            dataframe[result["name"]] = pd.to_numeric(
+                dataframe[result["name"]], errors="coerce"
+            ).astype("float64")
+        elif result["type"] == "boolean":
+            dataframe[result["name"]] = dataframe[result["name"]].astype("boolean")
+
+    return dataframe
+
+
 def delete_model(debiai_url, project_id, model_id):
     """Delete a model from a project"""
     try:
-        r = requests.request(
+        r = send_request(
             "DELETE",
             url=project_url(debiai_url, project_id) + "/models/" + model_id,
         )
         if r.status_code != 200:
             raise ValueError(json.loads(r.text))
-        logging.info("Deleted model: " + model_id)
+        logger.info("Deleted model: " + model_id)
         return True
     except requests.exceptions.RequestException:
         return False
 
 
 # Samples
-def get_project_samples(debiai_url, project_id, block_structure) -> pd.DataFrame:
-    DATA_TYPES = ["groundTruth", "contexts", "inputs", "others"]
+DATA_TYPES = ["groundTruth", "contexts", "inputs", "others"]
+
+
+def get_samples_columns_names(block_structure) -> List[str]:
+    """Return the columns names, in the order of the downloaded samples values"""
+    columns_names = []
+    for block in block_structure:
+        columns_names.append(block["name"])
+
+        for block_category in DATA_TYPES:
+            if block_category not in block:
+                continue
+
+            for column in block[block_category]:
+                columns_names.append(column["name"])
+    return columns_names
+
+
+def create_samples_columns(columns_names: List[str], projection=None) -> dict:
+    """
+    Return the empty columns filled by decode_samples
+    projection: optional list of the columns to keep, all are kept by default
+    """
+    if projection is not None:
+        for column_name in projection:
+            if column_name not in columns_names and column_name != "sample_id":
+                raise ValueError("Unknown column '" + str(column_name) + "'")
+
+    columns = {"sample_id": []}
+    for column_name in columns_names:
+        if projection is None or column_name in projection:
+            columns[column_name] = []
+    return columns
+
+
+def decode_samples(samples_data: dict, columns_names: List[str], columns: dict):
+    """
+    Append downloaded samples to the columns created by create_samples_columns
+    """
+
+    # Samples returned are in a {
+    #  "{sample_id}": [sample_data],
+    #  "{sample_id}": [sample_data],
+    #  "{sample_id}": [sample_data],
+    # } Format
+
+    # Map each values to the block structure
+    # Goal format: a list of values for each column
+    columns["sample_id"].extend(samples_data.keys())
+
+    # Transpose the samples values into columns,
+    # only the columns given by create_samples_columns are kept
+    samples_columns = zip(*samples_data.values())
+    for column_name, values in zip(columns_names, samples_columns):
+        if column_name in columns:
+            columns[column_name].extend(values)
+
+
+def decode_samples_stream(
+    r: requests.Response, columns_names: List[str], columns: dict, key="data"
+):
+    """
+    Same as decode_samples, from a streamed response (stream=True):
+    the samples are parsed as the response bytes arrive and their values are
+    appended to the columns one sample at a time, the response text and its
+    parsed dict are never held in memory
+    key: the response key of the samples, None if the samples are the response
+    """
+    sample_ids = columns["sample_id"]
+    kept_columns = [
+        (position, columns[column_name])
+        for position, column_name in enumerate(columns_names)
+        if column_name in columns
+    ]
+
+    chunks = r.iter_content(get_config().stream_chunk_size)
+    for sample_id, values in iter_json_object_items(chunks, key):
+        sample_ids.append(sample_id)
+        for position, column in kept_columns:
+            column.append(values[position])
+
+
+def samples_columns_to_df(columns: dict, block_structure) -> pd.DataFrame:
+    dataframe = pd.DataFrame(columns)
+
+    if dataframe.empty:
+        return dataframe
+
+    # Sort the dataframe rows by the blocks names
+    block_names = []
+    for block in block_structure:
+        block_names.append(block["name"])
+
+    dataframe = dataframe.sort_values(by=block_names)
+
+    return dataframe
+
+
+def samples_page_analysis(request_id: str, start: int, page_size: int, nb_samples):
+    """
+    The analysis object of the dataIdList and blocksFromSampleIds requests:
+    the pages of one listing of the project samples share its ID
+    """
+    return {
+        "id": request_id,
+        "start": start == 0,
+        "end": start + page_size >= nb_samples,
+    }
+
+
+def data_id_list_body(request_id: str, start: int, page_size: int, nb_samples):
+    """The body of the dataIdList request of a page of the project samples ID"""
+    return {
+        "from": start,
+        "to": start + page_size - 1,
+        "analysis": samples_page_analysis(request_id, start, page_size, nb_samples),
+    }
+
+
+def iter_project_samples_columns(
+    debiai_url, project_id, block_structure, projection=None
+):
+    """
+    Yield the project samples page by page,
+    each page as a list of values for each column of the projection
+    """
 
     # Get the project number of samples
     project = get_project(debiai_url, project_id)
     project_nbSamples = project["nbSamples"]
 
-    NB_SAMPLES_PER_REQUEST = 4000
     # Generate a random request ID
     request_id = str(int(time.time() * 1000000))
 
     # Get the list of samples
-    dataframe = pd.DataFrame()
-    for i in range(0, project_nbSamples, NB_SAMPLES_PER_REQUEST):
-        r = requests.request(
+    columns_names = get_samples_columns_names(block_structure)
+    page_size = get_config().samples_per_request
+    for i in range(0, project_nbSamples, page_size):
+        r = send_request(
             "POST",
             url=project_url(debiai_url, project_id) + "/dataIdList",
-            json={
-                "from": i,
-                "to": i + NB_SAMPLES_PER_REQUEST - 1,
-                "analysis": {
-                    "id": request_id,
-                    "start": i == 0,
-                    "end": i + NB_SAMPLES_PER_REQUEST >= project_nbSamples,
-                },
-            },
+            json=data_id_list_body(request_id, i, page_size, project_nbSamples),
         )
         sample_id_list = json.loads(r.text)
 
         # Download the samples
-        r = requests.request(
+        r = send_request(
             "POST",
             url=project_url(debiai_url, project_id) + "/blocksFromSampleIds",
             json={
                 "sampleIds": sample_id_list,
-                "analysis": {
-                    "id": request_id,
-                    "start": i == 0,
-                    "end": i + NB_SAMPLES_PER_REQUEST >= project_nbSamples,
-                },
+                "analysis": samples_page_analysis(
+                    request_id, i, page_size, project_nbSamples
+                ),
             },
+            stream=True,
         )
+        if r.status_code != 200:
+            raise ValueError(json.loads(r.text))
 
-        # Samples returned are in a {
-        #  "{sample_id}": [sample_data],
-        #  "{sample_id}": [sample_data],
-        #  "{sample_id}": [sample_data],
-        # } Format
-
-        # Map each values to the block structure
-        # Goal format: a DataFrame
-        samples_data = json.loads(r.text)["data"]
-        sample_dicts = []
-        for sample_id in samples_data:
-            sample = samples_data[sample_id]
-            sample_dict = {"sample_id": sample_id}
-
-            col_index = 0
-            for block in block_structure:
-                sample_dict[block["name"]] = sample[col_index]
-                col_index += 1
-
-                for block_category in DATA_TYPES:
-                    if block_category not in block:
-                        continue
-
-                    for column in block[block_category]:
-                        sample_dict[column["name"]] = sample[col_index]
-                        col_index += 1
-            sample_dicts.append(sample_dict)
-
-        new_dataframe = pd.DataFrame(sample_dicts)
-        dataframe = pd.concat([dataframe, new_dataframe])
+        columns = create_samples_columns(columns_names, projection)
+        decode_samples_stream(r, columns_names, columns)
+        yield columns
 
-    # Sort the dataframe rows by the blocks names
-    block_names = []
-    for block in block_structure:
-        block_names.append(block["name"])
 
-    dataframe = dataframe.sort_values(by=block_names)
+def get_project_samples_columns(
+    debiai_url, project_id, block_structure, projection=None
+) -> dict:
+    """Return the project samples as a list of values for each column"""
+    columns_names = get_samples_columns_names(block_structure)
+    columns = create_samples_columns(columns_names, projection)
 
-    return dataframe
+    for page in iter_project_samples_columns(
+        debiai_url, project_id, block_structure, projection
+    ):
+        for column_name in columns:
+            columns[column_name].extend(page[column_name])
 
+    return columns
 
-def get_selection_samples(
-    debiai_url, project_id, selection_id, block_structure
-) -> pd.DataFrame:
-    DATA_TYPES = ["groundTruth", "contexts", "inputs", "others"]
-    NB_SAMPLES_PER_REQUEST = 4000
 
-    # Get the selection samples
-    samples = get_samples_id_from_selection(debiai_url, project_id, selection_id)
+def get_project_samples(debiai_url, project_id, block_structure) -> pd.DataFrame:
+    columns = get_project_samples_columns(debiai_url, project_id, block_structure)
+    return samples_columns_to_df(columns, block_structure)
+
+
+def get_project_samples_id(debiai_url, project_id) -> List[str]:
+    """
+    Return the ID of all the project samples
+    The list is downloaded by pages, with the same requests as
+    iter_project_samples_columns: the first page is requested first and the last
+    one last, the pages between them with parallel requests
+    """
+    project = get_project(debiai_url, project_id)
+    project_nbSamples = project["nbSamples"]
+    page_size = get_config().samples_per_request
+    request_id = str(int(time.time() * 1000000))
+
+    def get_page(i):
+        r = send_request(
+            "POST",
+            url=project_url(debiai_url, project_id) + "/dataIdList",
+            json=data_id_list_body(request_id, i, page_size, project_nbSamples),
+        )
+        return json.loads(r.text)
+
+    starts = list(range(0, project_nbSamples, page_size))
+    if len(starts) <= 2:
+        pages = [get_page(i) for i in starts]
+    else:
+        pages = [get_page(starts[0])]
+        pages += parallel_map(get_page, starts[1:-1])
+        pages.append(get_page(starts[-1]))
+    return [sample_id for page in pages for sample_id in page]
 
-    # Get the samples
-    dataframe = pd.DataFrame()
-    for i in range(0, len(samples), NB_SAMPLES_PER_REQUEST):
+
+def get_samples_columns_from_ids(
+    debiai_url, project_id, samples_id: List[str], block_structure, projection=None
+) -> dict:
+    """
+    Return the given samples as a list of values for each column
+    The samples are downloaded by pages, with parallel requests
+    """
+    samples_id = list(samples_id)
+    columns_names = get_samples_columns_names(block_structure)
+    page_size = get_config().samples_per_request
+
+    def get_page(i):
         # Download the samples
-        r = requests.request(
+        r = send_request(
             "POST",
             url=project_url(debiai_url, project_id) + "/blocksFromSampleIds",
-            json={"sampleIds": samples[i : i + NB_SAMPLES_PER_REQUEST]},  # noqa
+            json={"sampleIds": samples_id[i : i + page_size]},  # noqa
+            stream=True,
         )
+        if r.status_code != 200:
+            raise ValueError(json.loads(r.text))
 
-        # Samples returned are in a {
-        #  "{sample_id}": [sample_data],
-        #  "{sample_id}": [sample_data],
-        #  "{sample_id}": [sample_data],
-        # } Format
-
-        # Map each values to the block structure
-        # Goal format: a DataFrame
-        samples_data = json.loads(r.text)["data"]
-        sample_dicts = []
-        for sample_id in samples_data:
-            sample = samples_data[sample_id]
-            sample_dict = {"sample_id": sample_id}
-
-            col_index = 0
-            for block in block_structure:
-                sample_dict[block["name"]] = sample[col_index]
-                col_index += 1
-
-                for block_category in DATA_TYPES:
-                    if block_category not in block:
-                        continue
-
-                    for column in block[block_category]:
-                        sample_dict[column["name"]] = sample[col_index]
-                        col_index += 1
-            sample_dicts.append(sample_dict)
-
-        new_dataframe = pd.DataFrame(sample_dicts)
-        dataframe = pd.concat([dataframe, new_dataframe])
+        page = create_samples_columns(columns_names, projection)
+        decode_samples_stream(r, columns_names, page)
+        return page
 
-    # Sort the dataframe rows by the blocks names
-    block_names = []
-    for block in block_structure:
-        block_names.append(block["name"])
+    pages = parallel_map(get_page, range(0, len(samples_id), page_size))
 
-    dataframe = dataframe.sort_values(by=block_names)
+    columns = create_samples_columns(columns_names, projection)
+    for page in pages:
+        for column_name in columns:
+            columns[column_name].extend(page[column_name])
+    return columns
 
-    return dataframe
+
+def get_selection_samples_columns(
+    debiai_url, project_id, selection_id, block_structure
+) -> dict:
+    """Return the selection samples as a list of values for each column"""
+
+    # Get the selection samples
+    samples = get_samples_id_from_selection(debiai_url, project_id, selection_id)
+
+    return get_samples_columns_from_ids(
+        debiai_url, project_id, samples, block_structure
+    )
+
+
+def get_selection_samples(
+    debiai_url, project_id, selection_id, block_structure
+) -> pd.DataFrame:
+    columns = get_selection_samples_columns(
+        debiai_url, project_id, selection_id, block_structure
+    )
+    return samples_columns_to_df(columns, block_structure)
 
 
 # Tags
 def get_tags(debiai_url, project_id):
     """Return a tag as JSON form id"""
-    r = requests.request("GET", url=project_url(debiai_url, project_id) + "/tags")
-    logging.info("get_tags response: " + str(r.status_code))
-    logging.info(r.text)
+    r = send_request("GET", url=project_url(debiai_url, project_id) + "/tags")
+    logger.info("get_tags response: " + str(r.status_code))
+    logger.info(r.text)
     return json.loads(r.text)
 
 
 def get_tag(debiai_url, project_id, tag_id):
     """Return a tag as JSON form id"""
-    r = requests.request(
+    r = send_request(
         "GET",
         url=project_url(debiai_url, project_id) + "/tags/" + str(tag_id),
     )
-    logging.info("get_tag response: " + str(r.status_code))
-    logging.info(r.text)
+    logger.info("get_tag response: " + str(r.status_code))
+    logger.info(r.text)
+    return json.loads(r.text)
+
+
+def post_tag(debiai_url, project_id, tag_name, tag_hash: dict):
+    """
+    Create or update a tag from a {sample_id: tag_value} dict,
+    return the tag as JSON
+    """
+    r = send_request(
+        "POST",
+        url=project_url(debiai_url, project_id) + "/tags",
+        json={"tagName": tag_name, "tagHash": tag_hash},
+    )
+    logger.info("post_tag response: " + str(r.status_code))
+    if r.status_code != 200:
+        raise ValueError(json.loads(r.text))
     return json.loads(r.text)
 
 
 def get_samples_from_tag(debiai_url, project_id, tag_id, tag_value):
     """Return a sample tree (JSON)"""
-    r = requests.request(
+    r = send_request(
         "GET",
         url=project_url(debiai_url, project_id)
         + "/tags/"
         + str(tag_id)
         + "/samples/"
         + str(tag_value),
+        stream=True,
     )
-    logging.info("get_samples_from_tag response: " + str(r.status_code))
-    return json.loads(r.text)
+    logger.info("get_samples_from_tag response: " + str(r.status_code))
+    return load_json(r.iter_content(get_config().stream_chunk_size))
 
 
 # Sample tree
@@ -517,13 +913,32 @@ def post_add_tree(debiai_url, project_id, tree):
 
     data = {"blockTree": tree}
 
-    r = requests.request(
+    r = send_request(
         "POST",
         url=project_url(debiai_url, project_id) + "/blocks",
         json=data,
     )
+    return __check_add_tree_response(r)
+
+
+def post_add_tree_json(debiai_url, project_id, tree_json: bytes):
+    """Add to an existing project a tree of samples already serialized to JSON"""
+    r = send_request(
+        "POST",
+        url=project_url(debiai_url, project_id) + "/blocks",
+        data=b'{"blockTree": ' + tree_json + b"}",
+        headers={"Content-Type": "application/json"},
+    )
+    return __check_add_tree_response(r)
+
+
+def __check_add_tree_response(r):
     if r.status_code == 201:
         print("No block added")
+    elif r.status_code >= 500:
+        raise ServerError(
+            "Server error " + str(r.status_code) + " while adding the data tree"
+        )
     elif r.status_code != 200:
         raise ValueError("Internal server error while adding the data tree")
     return True
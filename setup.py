@@ -17,6 +17,7 @@ setuptools.setup(
         "License :: OSI Approved :: Apache Software License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.9",
     install_requires=["numpy", "pandas", "requests"],
+    extras_require={"arrow": ["pyarrow"]},
 )
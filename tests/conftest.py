@@ -0,0 +1,16 @@
+import os
+
+from debiai.config import DebiaiConfig, configure_config
+from debiai.debiai_fake_backend import start_fake_backend
+
+# The tests run against the DebiAI backend at DEBIAI_APP_URL when it is set,
+# otherwise against a fake backend on the default url port.
+# If this port is already used, a DebiAI backend is expected to run there.
+if "DEBIAI_APP_URL" not in os.environ:
+    default_url = DebiaiConfig().debiai_app_url
+    try:
+        server = start_fake_backend(port=int(default_url.rsplit(":", 1)[1]))
+    except OSError:
+        pass
+    else:
+        configure_config(DebiaiConfig(debiai_app_url=server.url))
@@ -0,0 +1,116 @@
+import pytest
+import pandas as pd
+from debiai.debiai import Debiai
+from debiai.config import get_config
+
+pa = pytest.importorskip("pyarrow")
+
+config = get_config()
+debiai_instance = Debiai(config.debiai_app_url)
+
+PROJECT_NAME = "test_arrow"
+
+block_structure = [
+    {"name": "Dataset ID"},
+    {
+        "name": "Image ID",
+        "contexts": [
+            {"name": "My context 1", "type": "text"},
+            {"name": "My context 2", "type": "number"},
+        ],
+        "groundTruth": [{"name": "My groundtruth 1", "type": "number"}],
+    },
+]
+
+expected_results = [
+    {"name": "Model result", "type": "number"},
+    {"name": "Model error", "type": "text"},
+]
+
+
+def test_arrow(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(block_structure)
+    project.set_expected_results(expected_results)
+
+    # Add samples
+    with pytest.raises(TypeError) as e:
+        project.add_samples_arrow(pd.DataFrame())
+    assert "must be a pyarrow Table" in str(e.value)
+
+    with pytest.raises(ValueError) as e:
+        project.add_samples_arrow(pa.table({"Dataset ID": ["A"]}))
+    assert "missing" in str(e.value)
+
+    # Validated like the dataframes
+    invalid_table = pa.table(
+        {
+            "Dataset ID": ["A", "A"],
+            "Image ID": ["image-1", "image-2"],
+            "My context 1": ["A", "B"],
+            "My context 2": ["0.5", "high"],
+            "My groundtruth 1": [8, 7],
+        }
+    )
+    with pytest.raises(ValueError) as e:
+        project.add_samples_arrow(invalid_table)
+    assert "'My context 2' number column: 1 invalid values at rows 1" in str(e.value)
+
+    # Every slice is validated before the first upload
+    monkeypatch.setattr(config, "upload_chunk_size", 1)
+    with pytest.raises(ValueError) as e:
+        project.add_samples_arrow(invalid_table)
+    assert "invalid values at rows 1 " in str(e.value)
+    assert project.get_dataframe().empty
+    monkeypatch.undo()
+
+    samples_table = pa.table(
+        {
+            "Dataset ID": ["A", "A", "B"],
+            "Image ID": ["image-1", "image-2", "image-3"],
+            "My context 1": ["A", None, "C"],
+            "My context 2": [0.28, 0.388, float("nan")],
+            "My groundtruth 1": [8, 7, 19],
+        }
+    )
+    assert project.add_samples_arrow(samples_table)
+
+    # Get samples
+    samples_table_ret = project.get_arrow_table()
+    assert isinstance(samples_table_ret, pa.Table)
+    assert samples_table_ret.num_rows == 3
+    assert "sample_id" in samples_table_ret.column_names
+    assert samples_table_ret["Image ID"].to_pylist() == [
+        "image-1",
+        "image-2",
+        "image-3",
+    ]
+    assert samples_table_ret["My context 1"].to_pylist() == ["A", None, "C"]
+    assert samples_table_ret["My context 2"].to_pylist() == [0.28, 0.388, None]
+    assert samples_table_ret["My groundtruth 1"].to_pylist() == [8, 7, 19]
+
+    # Selection
+    sample_ids = samples_table_ret["sample_id"].to_pylist()[:2]
+    selection = project.create_selection("arrow selection", sample_ids)
+    selection_table = selection.get_arrow_table()
+    assert selection_table["Image ID"].to_pylist() == ["image-1", "image-2"]
+
+    # Add results
+    model = project.create_model("Model 1")
+    results_table = pa.table(
+        {
+            "Dataset ID": ["A", "A", "B"],
+            "Image ID": ["image-1", "image-2", "image-3"],
+            "Model result": [5, 7, 19],
+            "Model error": ["yes", "no", "no"],
+        }
+    )
+    assert model.add_results_arrow(results_table)
+
+    with pytest.raises(ValueError) as e:
+        model.add_results_arrow(results_table.drop_columns(["Model error"]))
+    assert "'Model error' is missing" in str(e.value)
+
+    debiai_instance.delete_project(project)
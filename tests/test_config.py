@@ -1,7 +1,139 @@
-from debiai.config import DebiaiConfig
+import io
+
+import pandas as pd
+import pytest
+import requests
+from debiai.config import DebiaiConfig, PRESETS, get_config
+from debiai.debiai import Debiai
+from debiai.debiai_project import utils
 
 
 def test_config():
     config = DebiaiConfig()
     assert config is not None
     assert config.debiai_app_url is not None
+    assert config.samples_per_request == 4000
+    assert config.timeout is None
+
+
+def test_config_presets():
+    for preset in PRESETS:
+        config = DebiaiConfig(preset=preset)
+        for knob, value in PRESETS[preset].items():
+            assert getattr(config, knob) == value
+
+    # The given knobs replace the preset values
+    config = DebiaiConfig(preset="wan_bulk", retries=0)
+    assert config.retries == 0
+    assert not config.compression
+
+    with pytest.raises(ValueError):
+        DebiaiConfig(preset="unknown")
+    with pytest.raises(TypeError):
+        DebiaiConfig(unknown_knob=1)
+    with pytest.raises(TypeError):
+        DebiaiConfig(samples_per_request="10")
+    with pytest.raises(ValueError):
+        DebiaiConfig(max_parallel_requests=0)
+    assert DebiaiConfig(upload_linger=0).upload_linger == 0
+
+
+def test_config_env():
+    config = DebiaiConfig.from_env(
+        {
+            "DEBIAI_APP_URL": "http://debiai:3000",
+            "DEBIAI_PRESET": "memory_constrained",
+            "DEBIAI_MAX_PARALLEL_REQUESTS": "3",
+            "DEBIAI_TIMEOUT": "12.5",
+            "DEBIAI_COMPRESSION": "yes",
+        }
+    )
+    assert config.debiai_app_url == "http://debiai:3000"
+    assert config.samples_per_request == 1000
+    assert config.max_parallel_requests == 3
+    assert config.timeout == 12.5
+    assert config.compression
+
+    assert DebiaiConfig.from_env({"DEBIAI_TIMEOUT": "none"}).timeout is None
+    with pytest.raises(ValueError):
+        DebiaiConfig.from_env({"DEBIAI_RETRIES": "many"})
+    with pytest.raises(ValueError):
+        DebiaiConfig.from_env({"DEBIAI_COMPRESSION": "maybe"})
+
+
+def test_config_compression_and_retries(monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, "compression", True)
+    monkeypatch.setattr(config, "retries", 2)
+    monkeypatch.setattr(config, "retry_backoff", 0)
+
+    # The first connection of each call fails, before anything is sent
+    send = requests.request
+    failed = set()
+
+    def flaky_request(method, url, **kwargs):
+        if (method, url) not in failed:
+            failed.add((method, url))
+            raise requests.exceptions.ConnectTimeout("Flaky network")
+        return send(method, url, **kwargs)
+
+    monkeypatch.setattr(requests, "request", flaky_request)
+
+    debiai_instance = Debiai(config.debiai_app_url)
+    if debiai_instance.get_project("test_config") is not None:
+        assert debiai_instance.delete_project_byId("test_config")
+    project = debiai_instance.create_project("test_config")
+    project.set_blockstructure(
+        [{"name": "Image ID", "contexts": [{"name": "Light", "type": "number"}]}]
+    )
+    samples_df = pd.DataFrame({"Image ID": ["image-1", "image-2"], "Light": [1, 2]})
+    assert project.add_samples_pd(samples_df)
+    assert project.get_dataframe()["Light"].tolist() == [1, 2]
+
+    # Without retries, the errors are raised
+    monkeypatch.setattr(config, "retries", 0)
+    failed.clear()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        utils.get_project(config.debiai_app_url, project.id)
+
+    monkeypatch.setattr(requests, "request", send)
+    assert debiai_instance.delete_project(project)
+
+
+def test_config_retries_idempotent(monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, "retries", 2)
+    monkeypatch.setattr(config, "retry_backoff", 0)
+
+    sent = []
+
+    def failing_request(error=None, status_code=503):
+        def request(method, url, **kwargs):
+            sent.append(method)
+            if error is not None:
+                raise error
+            r = requests.Response()
+            r.status_code = status_code
+            r.raw = io.BytesIO()
+            return r
+
+        return request
+
+    url = config.debiai_app_url + "/test"
+    for error, status_code, retried in [
+        (requests.exceptions.ReadTimeout("Slow backend"), None, False),
+        (requests.exceptions.ConnectionError("Connection aborted"), None, False),
+        (None, 503, False),
+        (requests.exceptions.ConnectTimeout("Backend down"), None, True),
+    ]:
+        monkeypatch.setattr(requests, "request", failing_request(error, status_code))
+
+        # A GET is sent again, a POST only if the connection wasn't opened
+        for method, nb_sent in [("GET", 3), ("POST", 3 if retried else 1)]:
+            sent.clear()
+            if error is None:
+                assert utils.send_request(method, url).status_code == status_code
+            else:
+                with pytest.raises(type(error)):
+                    utils.send_request(method, url)
+            assert sent == [method] * nb_sent
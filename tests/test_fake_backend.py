@@ -0,0 +1,21 @@
+import time
+import pandas as pd
+from debiai.debiai import Debiai
+from debiai.debiai_fake_backend import start_fake_backend
+
+
+def test_fake_backend_latency():
+    server = start_fake_backend(latency=0.05)
+    try:
+        start = time.time()
+        debiai_instance = Debiai(server.url)
+        assert time.time() - start >= 0.05
+        assert debiai_instance.get_projects() == []
+
+        project = debiai_instance.create_project("fake")
+        project.set_blockstructure([{"name": "Image ID"}])
+        project.add_samples_pd(pd.DataFrame({"Image ID": ["image-1", "image-2"]}))
+        samples_df = project.get_dataframe()
+        assert samples_df["Image ID"].tolist() == ["image-1", "image-2"]
+    finally:
+        server.shutdown()
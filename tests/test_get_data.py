@@ -1,7 +1,16 @@
+import json
+
+import numpy as np
 import pandas as pd
+import pytest
 from debiai.debiai import Debiai
-from debiai.debiai_project import Debiai_project, Debiai_selection
+from debiai.debiai_project import Debiai_project, Debiai_selection, utils
 from debiai.config import get_config
+from debiai.debiai_services.json_stream import (
+    iter_json_array,
+    iter_json_object_items,
+    load_json,
+)
 
 config = get_config()
 debiai_instance = Debiai(config.debiai_app_url)
@@ -95,3 +104,348 @@ def test_get_data():
     # Delete project
     assert debiai_instance.delete_project(project)
     assert debiai_instance.get_project(PROJECT_NAME) is None
+
+
+def test_large_selection(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure([{"name": "Image ID"}])
+    assert project.add_samples_pd(
+        pd.DataFrame({"Image ID": ["image-" + str(i) for i in range(11)]})
+    )
+    samples_df = project.get_dataframe()
+
+    # Stream the selection by chunks of 3 samples ID
+    monkeypatch.setattr(config, "selection_chunk_size", 3)
+    selection = project.create_selection(SELECTION_NAME, samples_df["sample_id"])
+    assert selection.nbSamples == 11
+    assert selection.get_samples_id() == samples_df["sample_id"].tolist()
+
+    # Numpy array of samples ID
+    samples_id = samples_df["sample_id"].to_numpy(dtype=str)[:2]
+    selection = project.create_selection(SELECTION_NAME + " 2", samples_id)
+    assert selection.get_samples_id() == samples_id.tolist()
+
+    with pytest.raises(ValueError) as e:
+        project.create_selection(SELECTION_NAME, np.array([1, 2]))
+    assert "list of string" in str(e.value)
+    with pytest.raises(ValueError) as e:
+        project.create_selection(SELECTION_NAME, ["a", 1])
+    assert "list of string" in str(e.value)
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_selection_from_query(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(
+        [
+            {
+                "name": "Image ID",
+                "contexts": [{"name": "My context 1", "type": "text"}],
+                "groundTruth": [{"name": "My groundtruth 1", "type": "number"}],
+            }
+        ]
+    )
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "My context 1": ["A", "B"] * 5,
+            "My groundtruth 1": range(10),
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+
+    # Download the samples by pages of 3 samples
+    monkeypatch.setattr(config, "samples_per_request", 3)
+    pages = list(project.iter_dataframes(columns=["My groundtruth 1"]))
+    assert len(pages) == 4
+    assert list(pages[0].columns) == ["sample_id", "My groundtruth 1"]
+
+    selection = project.create_selection_from_query(
+        "High groundtruth", "`My groundtruth 1` > 6"
+    )
+    assert selection.nbSamples == 3
+    assert selection.get_dataframe()["Image ID"].tolist() == [
+        "image-7",
+        "image-8",
+        "image-9",
+    ]
+
+    with pytest.raises(ValueError) as e:
+        project.create_selection_from_query("None", "`My groundtruth 1` > 60")
+    assert "No sample matches" in str(e.value)
+
+    df = project.get_dataframe()
+    selection = project.create_selection_from_mask(
+        "Context A", df, df["My context 1"] == "A"
+    )
+    assert selection.nbSamples == 5
+    selection = project.create_selection_from_mask("First", df, [True] + [False] * 9)
+    assert selection.get_samples_id() == [df["sample_id"].iloc[0]]
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_selections_dataframes(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(
+        [
+            {
+                "name": "Image ID",
+                "groundTruth": [{"name": "My groundtruth 1", "type": "number"}],
+            }
+        ]
+    )
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "My groundtruth 1": range(10),
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+    df = project.get_dataframe()
+    project.create_selection_from_mask("train", df, df["My groundtruth 1"] < 6)
+    project.create_selection_from_mask("val", df, df["My groundtruth 1"] >= 4)
+
+    monkeypatch.setattr(config, "samples_per_request", 3)
+    dataframes = project.get_selections_dataframes(["train", "val"])
+    assert dataframes["train"]["My groundtruth 1"].tolist() == list(range(6))
+    assert dataframes["val"]["My groundtruth 1"].tolist() == list(range(4, 10))
+    assert "sample_id" in dataframes["val"].columns
+
+    # The samples are now in the cache: nothing is downloaded
+    def no_download(*args):
+        raise AssertionError("Unexpected download")
+
+    monkeypatch.setattr(utils, "get_samples_columns_from_ids", no_download)
+    dataframes = project.get_selections_dataframes(["val"])
+    assert dataframes["val"]["Image ID"].tolist()[0] == "image-4"
+
+    with pytest.raises(ValueError) as e:
+        project.get_selections_dataframes(["test"])
+    assert "does not exist" in str(e.value)
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_selections_index(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure([{"name": "Image ID"}])
+    assert project.add_samples_pd(
+        pd.DataFrame({"Image ID": ["image-" + str(i) for i in range(5)]})
+    )
+    samples_id = project.get_dataframe()["sample_id"]
+
+    # Count the selections listings
+    nb_listings = []
+    get_selections = utils.get_selections
+
+    def counted_get_selections(*args):
+        nb_listings.append(1)
+        return get_selections(*args)
+
+    monkeypatch.setattr(utils, "get_selections", counted_get_selections)
+
+    names = ["selection " + str(i) for i in range(5)]
+    for i, name in enumerate(names):
+        project.create_selection(name, samples_id[: i + 1])
+
+    selections = project.get_selections_by_name(names + ["unknown"])
+    assert [s.nbSamples for s in selections[:5]] == [1, 2, 3, 4, 5]
+    assert selections[5] is None
+    assert len(nb_listings) == 1
+
+    for name in names:
+        assert project.get_selection(name).name == name
+    assert len(nb_listings) == 1
+
+    assert project.delete_selections(names[:3])
+    assert project.get_selection(names[0]) is None
+    assert [s.name for s in project.get_selections()] == names[3:]
+
+    with pytest.raises(ValueError) as e:
+        project.delete_selections([names[3], "unknown"])
+    assert "do not exist" in str(e.value)
+
+    # Models
+    model = project.create_model("Model 1")
+    assert model.name == "Model 1"
+    model_id = [m["id"] for m in project.get_models() if m["name"] == "Model 1"][0]
+    assert model_id != "Model 1"
+    assert model.id == model_id
+    assert project.get_model("Model 1").name == "Model 1"
+    assert project.get_model("Model 1").id == model_id
+    project.delete_model("Model 1")
+    assert project.get_model("Model 1") is None
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_tag_dataframe():
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(
+        [
+            {
+                "name": "Image ID",
+                "groundTruth": [{"name": "My groundtruth 1", "type": "number"}],
+            }
+        ]
+    )
+    assert project.add_samples_pd(
+        pd.DataFrame(
+            {
+                "Image ID": ["image-" + str(i) for i in range(6)],
+                "My groundtruth 1": range(6),
+            }
+        )
+    )
+    df = project.get_dataframe()
+
+    # Tag the even samples with 1, the odd ones with 2
+    tag_hash = {id: 1 + i % 2 for i, id in enumerate(df["sample_id"])}
+    tag = utils.post_tag(project.debiai_url, project.id, "parity", tag_hash)
+    assert project.get_tags()[0]["name"] == "parity"
+
+    tag_df = project.get_tag_dataframe(tag["id"], 1)
+    assert tag_df["Image ID"].tolist() == ["image-0", "image-2", "image-4"]
+    assert tag_df["My groundtruth 1"].tolist() == [0, 2, 4]
+    assert list(tag_df.columns) == list(df.columns)
+
+    assert project.get_tag_dataframe(tag["id"], 3).empty
+
+    tagged_ids = utils.get_samples_from_tag(
+        project.debiai_url, project.id, tag["id"], 1
+    )
+    assert sorted(tagged_ids) == sorted(df["sample_id"][::2])
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_sample_dataframe():
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(
+        [
+            {"name": "Dataset ID"},
+            {"name": "Image ID", "contexts": [{"name": "Light", "type": "number"}]},
+        ]
+    )
+    samples_df = pd.DataFrame(
+        {
+            "Dataset ID": ["A"] * 80 + ["B"] * 20,
+            "Image ID": ["image-" + str(i) for i in range(100)],
+            "Light": range(100),
+        }
+    )
+    project.add_samples_pd(samples_df)
+
+    sample_df = project.sample_dataframe(10, seed=1)
+    assert sample_df.shape[0] == 10
+    assert sample_df["sample_id"].is_unique
+    assert list(sample_df.columns) == list(project.get_dataframe().columns)
+
+    # Same seed, same draw
+    assert sample_df.equals(project.sample_dataframe(10, seed=1))
+    assert project.sample_dataframe(1000).shape[0] == 100
+    assert project.sample_dataframe(0).empty
+
+    # Stratified: proportional to the blocks sizes
+    sample_df = project.sample_dataframe(10, stratify_by="Dataset ID", seed=2)
+    assert sample_df["Dataset ID"].value_counts().to_dict() == {"A": 8, "B": 2}
+
+    with pytest.raises(ValueError):
+        project.sample_dataframe(10, stratify_by="Light")
+    with pytest.raises(ValueError):
+        project.sample_dataframe(-1)
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_samples_id_requests(monkeypatch):
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        assert debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure([{"name": "Image ID"}])
+    project.add_samples_pd(
+        pd.DataFrame({"Image ID": ["image-" + str(i) for i in range(10)]})
+    )
+    monkeypatch.setattr(config, "samples_per_request", 3)
+
+    # The ID list and the samples download send the same dataIdList requests
+    bodies = []
+    send_request = utils.send_request
+
+    def record_request(method, url, **kwargs):
+        if url.endswith("/dataIdList"):
+            bodies.append(kwargs["json"])
+        return send_request(method, url, **kwargs)
+
+    monkeypatch.setattr(utils, "send_request", record_request)
+    samples_id = utils.get_project_samples_id(project.debiai_url, project.id)
+    ids_bodies, bodies = bodies, []
+    columns = utils.get_project_samples_columns(
+        project.debiai_url, project.id, project.get_block_structure()
+    )
+    assert sorted(samples_id) == sorted(columns["sample_id"])
+
+    # The pages between the first and the last one are requested in parallel
+    ids_bodies.sort(key=lambda body: body["from"])
+    for ids_body, body in zip(ids_bodies, bodies):
+        assert ids_body["from"] == body["from"]
+        assert ids_body["analysis"]["start"] == body["analysis"]["start"]
+        assert ids_body["analysis"]["end"] == body["analysis"]["end"]
+    assert len(ids_bodies) == len(bodies) == 4
+    assert ids_bodies[0]["analysis"]["start"] and ids_bodies[-1]["analysis"]["end"]
+    assert len({body["analysis"]["id"] for body in ids_bodies}) == 1
+
+    assert debiai_instance.delete_project(project)
+
+
+def test_json_stream():
+    response = (
+        '{"nbSamples": 3, "other": {"data": [1, 2]},\n "data": {'
+        '"id-1": ["A", 1.5, true, null, [1, 2], {"k": "v"}], '
+        '"id-\u00e9": ["\u00e9t\u00e9 \\"quoted\\"", 12345, false, "", [], {}], '
+        '"id-3": ["B", -1e-3, true, 0, [[1]], {"a": {"b": 2}}]}}'
+    ).encode()
+    expected = json.loads(response)["data"]
+
+    # The values are the same whatever the chunks boundaries
+    for size in [1, 2, 7, 64, len(response)]:
+        starts = range(0, len(response), size)
+        chunks = [response[i : i + size] for i in starts]  # noqa
+        assert dict(iter_json_object_items(chunks, "data")) == expected
+        assert load_json(chunks) == json.loads(response)
+
+    assert list(iter_json_object_items([b" {} "])) == []
+    assert list(iter_json_array([b"[", b'"a", 1', b"0, ", b"2.5]"])) == ["a", 10, 2.5]
+    assert list(iter_json_array([b"[]"])) == []
+    assert load_json([b' ["a", ', b"2]"]) == ["a", 2]
+    assert load_json([b"4", b"2"]) == 42
+    assert load_json([b"null"]) is None
+    assert load_json([b"[-25", b"00", b".5e", b"-1]"]) == [-250.05]
+
+    # A large nested value, its strings and escapes cut by the chunks boundaries
+    tree = {"b" + str(i): [{"v": 'a\\"[{' * i, "n": -1.5e-3}] for i in range(100)}
+    response = json.dumps({"skip": tree, "data": tree}).encode()
+    for size in [7, 1000]:
+        starts = range(0, len(response), size)
+        chunks = [response[i : i + size] for i in starts]  # noqa
+        assert load_json(chunks) == {"skip": tree, "data": tree}
+        assert dict(iter_json_object_items(chunks, "data")) == tree
+
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'["a", "b"']))
+    with pytest.raises(ValueError):
+        list(iter_json_object_items([b'{"nbSamples": 3}'], "data"))
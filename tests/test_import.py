@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import json, logging, sys
+sys.path.insert(0, {root!r})
+import debiai
+from debiai.debiai import Debiai
+print(json.dumps({{
+    "modules": sorted(sys.modules),
+    "handlers": len(logging.getLogger().handlers),
+}}))
+"""
+
+
+def test_import_is_lazy(tmp_path):
+    # A new process, the tests already imported pandas and numpy
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(root=ROOT)],
+        cwd=tmp_path,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output)
+
+    for heavy_module in ["pandas", "numpy", "requests", "pyarrow"]:
+        assert heavy_module not in result["modules"]
+
+    # No logging configuration and no file written
+    assert result["handlers"] == 0
+    assert os.listdir(tmp_path) == []
+
+    # Package relative imports, no top-level "utils" module
+    assert "utils" not in result["modules"]
+    assert "debiai.utils" in result["modules"]
+
+
+def test_lazy_module():
+    from debiai.debiai_services.lazy_import import LazyModule
+
+    lazy_json = LazyModule("json")
+    assert "json" in repr(lazy_json)
+    assert lazy_json.dumps([1]) == "[1]"
+    assert lazy_json.loads is json.loads
@@ -1,5 +1,9 @@
+import threading
+import time
 import numpy as np
+import pytest
 import pandas as pd
+from debiai import utils
 from debiai.debiai import Debiai
 from debiai.config import get_config
 
@@ -140,3 +144,686 @@ def test_samples_null_values():
     )
     assert project.add_samples_pd(samples_df)
     debiai_instance.delete_project(project)
+
+
+def test_samples_df_modes(monkeypatch):
+    project = create_empty_project()
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-1", "image-2", "image-3"],
+            "My context 1": ["A", "B", "C"],
+            "My context 2": [0.28, 0.388, 0.5],
+            "My groundtruth 1": [8, 7, 19],
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+
+    # Nothing new: the index is created from the project samples
+    assert project.add_samples_pd(samples_df, mode="skip_existing")
+    assert project.get_samples_index().shape[0] == 3
+
+    # One known sample with other values, one new sample and a duplicate
+    new_samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-1", "image-2", "image-4", "image-4"],
+            "My context 1": ["A", "Z", "D", "E"],
+            "My context 2": [0.28, 0.388, 0.6, 0.7],
+            "My groundtruth 1": [8, 7, 20, 21],
+        }
+    )
+    assert project.add_samples_pd(new_samples_df, mode="skip_existing")
+    samples_df_ret = project.get_dataframe()
+    assert samples_df_ret["Image ID"].tolist() == [
+        "image-1",
+        "image-2",
+        "image-3",
+        "image-4",
+    ]
+    assert samples_df_ret["My context 1"].tolist() == ["A", "B", "C", "D"]
+
+    # The local index matches the one created from the project samples,
+    # only the blocks names are downloaded to create it
+    samples_index = project.get_samples_index()
+    assert samples_index.shape[0] == 4
+    projections = []
+    get_columns = utils.get_project_samples_columns
+
+    def get_project_samples_columns(*args, projection=None):
+        projections.append(projection)
+        return get_columns(*args, projection=projection)
+
+    monkeypatch.setattr(
+        utils, "get_project_samples_columns", get_project_samples_columns
+    )
+    refreshed_index = project.get_samples_index(refresh=True)
+    assert projections == [["Image ID"]]
+    assert refreshed_index.sort_values().equals(samples_index.sort_values())
+
+    for mode in ["upsert", "replace"]:
+        with pytest.raises(ValueError) as e:
+            project.add_samples_pd(samples_df, mode=mode)
+        assert "Unknown mode" in str(e.value)
+    debiai_instance.delete_project(project)
+
+
+def test_samples_iter():
+    project = create_empty_project()
+
+    def records():
+        yield {"Image ID": "image-1", "My context 1": "A", "My context 2": 0.28}
+        yield {"Image ID": "image-2", "My context 1": "B", "My context 2": 0.388}
+
+    with pytest.raises(ValueError) as e:
+        project.add_samples_iter(records())
+    assert "My groundtruth 1" in str(e.value)
+
+    rows = [("image-" + str(i), "A", i / 10, i) for i in range(12000)]
+    columns = ["Image ID", "My context 1", "My context 2", "My groundtruth 1"]
+    assert project.add_samples_iter(iter(rows), columns=columns)
+
+    with pytest.raises(ValueError) as e:
+        project.add_samples_iter(iter(rows))
+    assert "columns names are required" in str(e.value)
+
+    samples_df_ret = project.get_dataframe()
+    assert samples_df_ret.shape[0] == 12000
+    debiai_instance.delete_project(project)
+
+
+def test_samples_from_file(tmp_path, monkeypatch):
+    project = create_empty_project()
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-1", "image-2", "image-3"],
+            "My context 1": ["A", "B", "C"],
+            "My context 2": [0.28, 0.388, 0.5],
+            "My groundtruth 1": [8, 7, 19],
+            "Not required": [1, 2, 3],
+        }
+    )
+    samples_df.to_csv(tmp_path / "samples.csv", index=False)
+    assert project.add_samples_from_file(str(tmp_path / "samples.csv"))
+
+    samples_df_ret = project.get_dataframe()
+    assert samples_df_ret["My context 1"].tolist() == ["A", "B", "C"]
+    assert "Not required" not in samples_df_ret.columns
+
+    with pytest.raises(ValueError) as e:
+        project.add_samples_from_file(str(tmp_path / "samples.txt"))
+    assert "Unknown samples file format" in str(e.value)
+
+    # The same block in two chunks with different inferred dtypes
+    monkeypatch.setattr(config, "upload_chunk_size", 2)
+    numbers_df = pd.DataFrame(
+        {
+            "Image ID": ["3", "4", "1.5", "3"],
+            "My context 1": ["A"] * 4,
+            "My context 2": [0.5] * 4,
+            "My groundtruth 1": [1] * 4,
+        }
+    )
+    numbers_df.to_csv(tmp_path / "numbers.csv", index=False)
+    assert project.add_samples_from_file(str(tmp_path / "numbers.csv"))
+    assert project.get_dataframe().shape[0] == 6
+    monkeypatch.undo()
+
+    pytest.importorskip("pyarrow")
+    samples_df["Image ID"] = ["image-4", "image-5", "image-6"]
+    samples_df.to_parquet(tmp_path / "samples.parquet")
+    assert project.add_samples_from_file(str(tmp_path / "samples.parquet"))
+    assert project.get_dataframe().shape[0] == 9
+    debiai_instance.delete_project(project)
+
+
+def test_results_dataframe(monkeypatch):
+    project = create_empty_project()
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "My context 1": ["A"] * 10,
+            "My context 2": [0.5] * 10,
+            "My groundtruth 1": range(10),
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+
+    model = project.create_model("Model 1")
+    results_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "Model result": range(10),
+            "Model confidence": [0.5, 1] * 5,
+            "Model error": ["yes", "no"] * 5,
+        }
+    )
+    assert model.add_results_df(results_df)
+
+    monkeypatch.setattr(config, "samples_per_request", 3)
+    pages = list(model.iter_results_dataframes())
+    assert [page.shape[0] for page in pages] == [3, 3, 3, 1]
+
+    results_df_ret = model.get_results_dataframe()
+    assert list(results_df_ret.columns) == [
+        "sample_id",
+        "Model result",
+        "Model confidence",
+        "Model error",
+    ]
+    assert results_df_ret["Model result"].dtype == "float64"
+    assert sorted(results_df_ret["Model result"].tolist()) == list(range(10))
+    assert results_df_ret["Model confidence"].sum() == 7.5
+
+    # The results sample_id are the project samples id
+    samples_id = project.get_dataframe()["sample_id"]
+    assert set(results_df_ret["sample_id"]) == set(samples_id)
+
+    # Same converter as the uploader: every column is required
+    with pytest.raises(ValueError) as e:
+        model.add_results_df(pd.DataFrame({"Model result": [1]}))
+    assert "'Image ID' is missing from the given results" in str(e.value)
+    debiai_instance.delete_project(project)
+
+
+def test_joined_dataframe():
+    project = create_empty_project()
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-1", "image-2", "image-3"],
+            "My context 1": ["A", "B", "C"],
+            "My context 2": [0.28, 0.388, 0.5],
+            "My groundtruth 1": [8, 7, 19],
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+
+    model_1 = project.create_model("Model 1")
+    model_1.add_results_df(
+        pd.DataFrame(
+            {
+                "Image ID": ["image-3", "image-1", "image-2"],
+                "Model result": [19, 5, 7],
+                "Model confidence": [0.9, 0.22, 0.8],
+                "Model error": ["no", "yes", "no"],
+            }
+        )
+    )
+    model_2 = project.create_model("Model 2")
+    model_2.add_results_df(
+        pd.DataFrame(
+            {
+                "Image ID": ["image-2"],
+                "Model result": [3],
+                "Model confidence": [0.5],
+                "Model error": ["yes"],
+            }
+        )
+    )
+
+    joined_df = project.get_joined_dataframe(
+        ["Model 1", "Model 2"], columns=["My groundtruth 1"]
+    )
+    assert list(joined_df.columns) == [
+        "sample_id",
+        "Image ID",
+        "My groundtruth 1",
+        "Model 1_Model result",
+        "Model 1_Model confidence",
+        "Model 1_Model error",
+        "Model 2_Model result",
+        "Model 2_Model confidence",
+        "Model 2_Model error",
+    ]
+    assert joined_df["Model 1_Model result"].tolist() == [5, 7, 19]
+    assert joined_df["Model 1_Model error"].tolist() == ["yes", "no", "no"]
+    assert joined_df["Model 2_Model result"].isna().tolist() == [True, False, True]
+    assert joined_df["Model 2_Model error"].tolist()[1] == "yes"
+
+    with pytest.raises(ValueError) as e:
+        project.get_joined_dataframe(["Model 3"])
+    assert "does not exist" in str(e.value)
+    debiai_instance.delete_project(project)
+
+
+def test_uploader():
+    project = create_empty_project()
+    model = project.create_model("Model 1")
+
+    with project.uploader(max_queue_bytes=10000) as uploader:
+        uploader.chunk_size = 40
+        futures = []
+        for i in range(0, 100, 10):
+            ids = ["image-" + str(j) for j in range(i, i + 10)]
+            samples_df = pd.DataFrame(
+                {
+                    "Image ID": ids,
+                    "My context 1": ["A"] * 10,
+                    "My context 2": [0.5] * 10,
+                    "My groundtruth 1": range(i, i + 10),
+                }
+            )
+            results_df = pd.DataFrame(
+                {
+                    "Image ID": ids,
+                    "Model result": range(10),
+                    "Model confidence": [0.9] * 10,
+                    "Model error": ["no"] * 10,
+                }
+            )
+            futures.append(uploader.add_samples(samples_df))
+            futures.append(uploader.add_results("Model 1", results_df))
+
+        uploader.flush()
+        assert all(future.result() for future in futures)
+
+        with pytest.raises(ValueError):
+            uploader.add_samples(pd.DataFrame({"Image ID": ["image-0"]}))
+        with pytest.raises(ValueError):
+            uploader.add_results("Model 2", results_df)
+
+    assert project.get_dataframe().shape[0] == 100
+    assert model.get_results_dataframe().shape[0] == 100
+
+    with pytest.raises(ValueError):
+        uploader.add_samples(samples_df)
+
+    # A submission that doesn't fill a chunk is uploaded after linger seconds,
+    # without a flush
+    with project.uploader() as uploader:
+        uploader.linger = 0.05
+        future = uploader.add_samples(
+            samples_df.head(1).assign(**{"Image ID": "image-100"})
+        )
+        assert future.result(timeout=5)
+        assert project.get_dataframe().shape[0] == 101
+
+    debiai_instance.delete_project(project)
+
+
+def test_spool(tmp_path, monkeypatch):
+    import requests
+    from debiai.debiai_project import utils
+    from debiai.debiai_spool import Debiai_spool
+
+    project = create_empty_project()
+    model = project.create_model("Model 1")
+    spool = project.set_spool(str(tmp_path))
+
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "My context 1": ["A"] * 10,
+            "My context 2": [0.5] * 10,
+            "My groundtruth 1": range(10),
+        }
+    )
+    results_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(10)],
+            "Model result": range(10),
+            "Model confidence": [0.5] * 10,
+            "Model error": ["no"] * 10,
+        }
+    )
+
+    # The backend is down: the uploads are spooled, nothing is raised
+    def backend_down(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("Backend down")
+
+    def backend_restarting(*args, **kwargs):
+        raise utils.ServerError("Server error 503 while adding the data tree")
+
+    def journal_error(*args, **kwargs):
+        raise OSError("Journal error")
+
+    with monkeypatch.context() as m:
+        m.setattr(utils, "post_add_tree", backend_down)
+        m.setattr(utils, "post_model_results_dict", backend_down)
+        assert project.add_samples_pd(samples_df)
+        assert model.add_results_df(results_df)
+        assert project.flush_spool() == 2
+
+        # A new spool on the same directory, after a crash, finds the pending uploads
+        project.set_spool(None)
+        spool = project.set_spool(Debiai_spool(str(tmp_path), drain_interval=0.05))
+        assert spool.nb_pending() == 2
+        assert project.get_dataframe().empty
+
+        # A restarting backend doesn't raise, the uploads stay in the spool
+        m.setattr(utils, "post_add_tree", backend_restarting)
+        assert project.flush_spool() == 2
+
+        # An unexpected error doesn't stop the background replay
+        m.setattr(utils, "post_add_tree", journal_error)
+        time.sleep(0.2)
+        assert spool.nb_pending() == 2
+
+    # The backend is back: the background thread replays the uploads in order
+    deadline = time.time() + 5
+    while spool.nb_pending() and time.time() < deadline:
+        time.sleep(0.05)
+    assert project.flush_spool() == 0
+    assert project.get_dataframe().shape[0] == 10
+    assert model.get_results_dataframe().shape[0] == 10
+
+    # A chunk refused by the backend (unknown project, 404) is set aside,
+    # the next chunks are still sent
+    spool.add_tree(project.debiai_url, "unknown-project", [{"name": "image-10"}])
+    project.add_samples_pd(samples_df.assign(**{"Image ID": "image-11"}).head(1))
+    assert project.flush_spool() == 0
+    assert project.get_dataframe().shape[0] == 11
+    refused = spool.refused_chunks()
+    assert len(refused) == 1
+    assert refused[0]["entry"]["project_id"] == "unknown-project"
+
+    spool.close()
+    spool = Debiai_spool(str(tmp_path))
+    assert spool.nb_pending() == 0
+    assert len(spool.refused_chunks()) == 1
+    spool.close()
+
+    project.set_spool(None)
+    with pytest.raises(ValueError):
+        project.flush_spool()
+    debiai_instance.delete_project(project)
+
+
+def test_samples_processes(monkeypatch):
+    from debiai.debiai_services.df_to_dict_tree import root_block_chunks
+
+    multi_block_structure = [
+        {"name": "Dataset ID"},
+        {"name": "Image ID", "contexts": [{"name": "Context", "type": "text"}]},
+    ]
+    if debiai_instance.get_project(PROJECT_NAME) is not None:
+        debiai_instance.delete_project_byId(PROJECT_NAME)
+    project = debiai_instance.create_project(PROJECT_NAME)
+    project.set_blockstructure(multi_block_structure)
+
+    samples_df = pd.DataFrame(
+        {
+            "Dataset ID": ["A", "B", "C", "A", "B", "A", "D", "A"],
+            "Image ID": ["image-" + str(i) for i in range(8)],
+            "Context": list("abcdefgh"),
+        }
+    )
+
+    # The chunks are cut at the root blocks boundaries,
+    # unless a root block is bigger than a chunk
+    chunks = list(root_block_chunks(samples_df, multi_block_structure, 3))
+    assert [chunk["Dataset ID"].tolist() for chunk in chunks] == [
+        ["A", "A", "A"],
+        ["A", "B", "B"],
+        ["C", "D"],
+    ]
+    chunks = list(root_block_chunks(samples_df, multi_block_structure, 5))
+    assert [chunk["Dataset ID"].tolist() for chunk in chunks] == [
+        ["A", "A", "A", "A"],
+        ["B", "B", "C", "D"],
+    ]
+
+    monkeypatch.setattr(config, "upload_chunk_size", 3)
+    assert project.add_samples_pd(samples_df, processes=2)
+
+    samples_df_ret = project.get_dataframe()
+    assert samples_df_ret.shape[0] == 8
+    assert (
+        samples_df_ret.set_index("Image ID")["Context"]
+        .sort_index()
+        .equals(samples_df.set_index("Image ID")["Context"].sort_index())
+    )
+
+    samples = np.array(
+        [
+            ["Dataset ID", "Image ID", "Context"],
+            ["E", "image-8", "i"],
+            ["E", "image-9", "j"],
+        ]
+    )
+    assert project.add_samples(samples, processes=2)
+    assert project.get_dataframe().shape[0] == 10
+    debiai_instance.delete_project(project)
+
+
+def test_samples_validation():
+    project = create_empty_project()
+
+    # Every invalid column is reported before any upload
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-1", "image-2", "image-3", "image-4"],
+            "My context 1": ["A", ["B"], "C", "D"],
+            "My context 2": [0.28, "high", "low", 0.5],
+            "My groundtruth 1": ["8", 7, None, "19"],
+        }
+    )
+    with pytest.raises(ValueError) as e:
+        project.add_samples_pd(samples_df)
+    assert "'My context 1' text column: 1 invalid values at rows 1" in str(e.value)
+    assert "'My context 2' number column: 2 invalid values at rows 1-2" in str(e.value)
+    assert "My groundtruth 1" not in str(e.value)
+    assert project.get_dataframe().empty
+
+    # The valid values are coerced to the columns types
+    samples_df["My context 1"] = ["A", "B", 3, None]
+    samples_df["My context 2"] = [0.28, "0.3", None, 1]
+    assert project.add_samples_pd(samples_df)
+
+    samples_df_ret = project.get_dataframe()
+    assert samples_df_ret["My context 1"].tolist()[:3] == ["A", "B", "3"]
+    assert samples_df_ret["My groundtruth 1"].tolist()[:2] == [8, 7]
+    assert samples_df_ret["My context 2"].tolist()[1] == 0.3
+    debiai_instance.delete_project(project)
+
+
+def test_samples_validation_chunks(monkeypatch):
+    project = create_empty_project()
+    monkeypatch.setattr(config, "upload_chunk_size", 10)
+
+    columns = ["Image ID", "My context 1", "My context 2", "My groundtruth 1"]
+    rows = [("image-" + str(i), "A", i / 10, i) for i in range(30)]
+    rows[25] = ("image-25", "A", "high", 25)
+
+    # An array is validated before the first upload, the rows are counted from
+    # the first sample
+    with pytest.raises(ValueError) as e:
+        project.add_samples(np.array(rows, dtype=object), columns=columns)
+    assert "number column: 1 invalid values at rows 25 " in str(e.value)
+    assert "already uploaded" not in str(e.value)
+    assert project.get_dataframe().empty
+
+    # The chunks of an iterable are validated as they are uploaded
+    with pytest.raises(ValueError) as e:
+        project.add_samples_iter(iter(rows), columns=columns)
+    assert "number column: 1 invalid values at rows 25 " in str(e.value)
+    assert "The 20 samples of the previous chunks were already uploaded" in str(e.value)
+    assert project.get_dataframe().shape[0] == 20
+    debiai_instance.delete_project(project)
+
+
+def test_coerce_column():
+    from collections import OrderedDict
+    from debiai.debiai_services.validation import coerce_column
+
+    texts, invalid = coerce_column(pd.Series(["a", 1, None, [1]]), "text")
+    assert texts.tolist()[:3] == ["a", "1", None]
+    assert invalid.tolist() == [False, False, False, True]
+
+    values = pd.Series(["True", 0, None, "maybe", [1]])
+    booleans, invalid = coerce_column(values, "boolean")
+    assert booleans.tolist()[:4] == [True, False, None, None]
+    assert invalid.tolist() == [False, False, False, True, True]
+    booleans, invalid = coerce_column(pd.Series([True, None, False]), "boolean")
+    assert booleans.tolist() == [True, None, False]
+    assert invalid is None
+
+    values = pd.Series([[1], (2, 3), np.array([4]), None, "x"])
+    lists, invalid = coerce_column(values, "list")
+    assert lists.tolist()[:4] == [[1], [2, 3], [4], None]
+    assert invalid.tolist() == [False, False, False, False, True]
+
+    values = pd.Series([{"a": 1}, OrderedDict(b=2), None, 1])
+    _, invalid = coerce_column(values, "dict")
+    assert invalid.tolist() == [False, False, False, True]
+
+
+def test_samples_np_columns():
+    project = create_empty_project()
+
+    # Labels given apart from the values
+    samples_np = np.array([[1, 10, 0.5, 3], [2, 20, 0.7, 4]])
+    columns = ["Image ID", "Unused", "My context 2", "My groundtruth 1"]
+    with pytest.raises(ValueError):
+        project.add_samples(samples_np, columns=columns[:3])
+    with pytest.raises(ValueError):
+        project.add_samples(samples_np, columns=columns)  # 'My context 1' missing
+
+    samples_np = np.array(
+        [("image-1", "A", 0.5, 3), ("image-2", "B", 0.7, 4)],
+        dtype=[
+            ("Image ID", "U10"),
+            ("My context 1", "U10"),
+            ("My context 2", "f8"),
+            ("My groundtruth 1", "i8"),
+        ],
+    )
+    assert project.add_samples(samples_np)
+
+    samples_np = np.array([["image-3", "C", 0.9, 5]], dtype=object)
+    columns = ["Image ID", "My context 1", "My context 2", "My groundtruth 1"]
+    assert project.add_samples(samples_np, columns=columns)
+
+    samples_df = project.get_dataframe()
+    assert samples_df["Image ID"].tolist() == ["image-1", "image-2", "image-3"]
+    assert samples_df["My context 2"].tolist() == [0.5, 0.7, 0.9]
+    assert samples_df["My groundtruth 1"].tolist() == [3, 4, 5]
+    debiai_instance.delete_project(project)
+
+
+def test_samples_np_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "upload_chunk_size", 3)
+    project = create_empty_project()
+
+    samples_np = np.array(
+        [("image-" + str(i), "A", i / 10, i) for i in range(7)],
+        dtype=[
+            ("Image ID", "U10"),
+            ("My context 1", "U10"),
+            ("My context 2", "f8"),
+            ("My groundtruth 1", "i8"),
+        ],
+    )
+
+    # Memory mapped array
+    np.save(tmp_path / "samples.npy", samples_np)
+    samples_mmap = np.load(tmp_path / "samples.npy", mmap_mode="r")
+    assert project.add_samples(samples_mmap)
+    assert project.get_dataframe().shape[0] == 7
+
+    # npy and npz files
+    assert project.add_samples_from_file(str(tmp_path / "samples.npy"))
+
+    numbers = np.array([[i, i / 10, i] for i in range(7, 12)])
+    np.savez_compressed(tmp_path / "samples.npz", numbers=numbers)
+    with pytest.raises(ValueError):
+        project.add_samples_from_file(str(tmp_path / "samples.npz"))
+    columns = ["Image ID", "My context 2", "My groundtruth 1"]
+    with pytest.raises(ValueError):
+        # 'My context 1' is missing
+        project.add_samples_from_file(str(tmp_path / "samples.npz"), columns=columns)
+
+    numbers = np.array([[i, 0, i / 10, i] for i in range(7, 12)])
+    np.savez_compressed(tmp_path / "samples.npz", numbers=numbers, other=numbers)
+    columns = ["Image ID", "My context 1", "My context 2", "My groundtruth 1"]
+    with pytest.raises(ValueError):
+        project.add_samples_from_file(str(tmp_path / "samples.npz"), columns=columns)
+    assert project.add_samples_from_file(
+        str(tmp_path / "samples.npz"), columns=columns, key="numbers"
+    )
+
+    # Labels row: an array of Python objects, loaded in memory
+    samples_np = np.array([columns, ["image-12", "B", 1.2, 12]], dtype=object)
+    np.save(tmp_path / "labels.npy", samples_np)
+    assert project.add_samples_from_file(
+        str(tmp_path / "labels.npy"), mmap_mode=None, allow_pickle=True
+    )
+
+    samples_df = project.get_dataframe()
+    assert samples_df.shape[0] == 13
+    assert sorted(samples_df["My groundtruth 1"].tolist()) == list(range(13))
+    debiai_instance.delete_project(project)
+
+
+def test_concurrent_project(monkeypatch):
+    project = create_empty_project()
+    samples_df = pd.DataFrame(
+        {
+            "Image ID": ["image-" + str(i) for i in range(20)],
+            "My context 1": ["A"] * 20,
+            "My context 2": [0.5] * 20,
+            "My groundtruth 1": range(20),
+        }
+    )
+    assert project.add_samples_pd(samples_df)
+
+    # The threads fetching the project at the same time share one request
+    get_project = utils.get_project
+    nb_requests = []
+
+    def slow_get_project(*args):
+        nb_requests.append(1)
+        time.sleep(0.2)
+        return get_project(*args)
+
+    nb_threads = 8
+    barrier = threading.Barrier(nb_threads)
+
+    def fetch():
+        barrier.wait()
+        return project.fetch_snapshot()
+
+    with monkeypatch.context() as m:
+        m.setattr(utils, "get_project", slow_get_project)
+        threads = [threading.Thread(target=fetch) for _ in range(nb_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(nb_requests) < nb_threads
+
+    snapshot = project.snapshot
+    assert snapshot.block_structure == block_structure
+    assert snapshot.expected_results == expected_results
+
+    # Models created and filled by several threads
+    errors = []
+
+    def upload(i):
+        try:
+            model = project.create_model("Model " + str(i))
+            results_df = pd.DataFrame(
+                {
+                    "Image ID": samples_df["Image ID"],
+                    "Model result": [i] * 20,
+                    "Model confidence": [0.9] * 20,
+                    "Model error": ["no"] * 20,
+                }
+            )
+            assert model.add_results_df(results_df)
+            assert project.get_model("Model " + str(i)).id == model.id
+            results = model.get_results_dataframe()
+            assert results["Model result"].tolist() == [i] * 20
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    assert len(project.get_models()) == 4
+    for i in range(4):
+        assert project.get_model("Model " + str(i)) is not None
+
+    debiai_instance.delete_project(project)
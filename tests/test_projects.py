@@ -58,3 +58,28 @@ def test_project_deletion_by_id():
     debiai_instance.delete_project_byId(project.id)
 
     assert len(debiai_instance.get_projects()) == nb_projects - 1
+
+
+def test_delete_projects():
+    names = ["test_bulk_" + str(i) for i in range(6)]
+    for name in names:
+        debiai_instance.create_project(name)
+
+    summaries = debiai_instance.list_project_summaries()
+    assert set(names) <= {p["name"] for p in summaries}
+    assert all("id" in p for p in summaries)
+
+    assert debiai_instance.delete_projects(names[:2]) == names[:2]
+    deleted = debiai_instance.delete_projects(
+        lambda p: p["name"].startswith("test_bulk_"), max_workers=2
+    )
+    assert sorted(deleted) == names[2:]
+    assert debiai_instance.get_project(names[5]) is None
+
+    with pytest.raises(ValueError) as execution_info:
+        debiai_instance.delete_projects(["unknown_project", ""])
+    assert "must be non empty strings" in str(execution_info.value)
+
+    with pytest.raises(ValueError) as execution_info:
+        debiai_instance.delete_projects(["unknown_project"])
+    assert "unknown_project" in str(execution_info.value)